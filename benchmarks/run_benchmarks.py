@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the public parsing functions of e_time.
+
+Each benchmark runs over a synthetic corpus of realistic listings, generated
+with a fixed seed so that runs are reproducible, and reports operations per
+second along with the peak memory traced while running the corpus once.
+
+Examples:
+
+    python benchmarks/run_benchmarks.py --output baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json
+    python benchmarks/run_benchmarks.py --filter repeat_phrase
+
+The time taken by "import e_time" in a fresh interpreter is measured with
+python -X importtime and compared in the same way, as imports per second.
+"""
+import argparse
+from datetime import date, datetime, timedelta
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pytz  # noqa: E402
+
+from e_time import (  # noqa: E402
+    cache_clear, guess_date, parse_repeat_phrase, parse_single_event, parse_time_range,
+    set_cache_size,
+)
+from e_time.parser import DEFAULT_CACHE_SIZE  # noqa: E402
+from e_time.tokens_and_syntax import parse  # noqa: E402
+
+SEED = 20180115
+CORPUS_SIZE = 2000
+# Listings repeat the same strings, so corpora are drawn from a pool of
+# distinct strings smaller than the default cache size.
+DISTINCT_STRINGS = 200
+TIME_ZONE = pytz.timezone('US/Eastern')
+NOW = TIME_ZONE.localize(datetime(2018, 6, 1, 12))
+
+BENCHMARKS = []
+
+
+def benchmark(name):
+    """
+    Register a function which builds a corpus and returns a callable that
+    processes it, along with the number of operations per call.
+    """
+    def register(func):
+        BENCHMARKS.append((name, func))
+        return func
+    return register
+
+
+def _time_of_day(rng, with_minutes):
+    hour = rng.randint(1, 12)
+    if with_minutes:
+        return '%d:%02d' % (hour, rng.choice((0, 15, 30, 45)))
+    return str(hour)
+
+
+def time_range_corpus(rng, size, with_midnight=True):
+    """
+    Generate time range strings in the forms seen in listings.
+    """
+    indicators = ('pm', 'am', 'p', 'PM', 'p.m.')
+    corpus = []
+    for _ in range(size):
+        start = _time_of_day(rng, rng.random() < 0.3)
+        stop = _time_of_day(rng, rng.random() < 0.3)
+        indicator = rng.choice(indicators)
+        form = rng.randrange(5 if with_midnight else 4)
+        if form == 0:
+            corpus.append('%s%s' % (start, indicator))
+        elif form == 1:
+            corpus.append('%s%s-%s%s' % (start, indicator, stop, rng.choice(indicators)))
+        elif form == 2:
+            corpus.append('%s-%s%s' % (start, stop, indicator))
+        elif form == 3:
+            corpus.append('%s %s – %s %s' % (start, indicator.upper(), stop, indicator.upper()))
+        else:
+            corpus.append('%s%s-midnight' % (start, indicator))
+    return corpus
+
+
+def single_event_corpus(rng, size):
+    """
+    Generate single event strings in the forms seen in listings.
+    """
+    months = ('January', 'feb', 'March', 'apr', 'June', 'Sep', 'december')
+    corpus = []
+    for time_range in time_range_corpus(rng, size, with_midnight=False):
+        day = rng.randint(1, 28)
+        if rng.random() < 0.3:
+            corpus.append('%s %d, %d %s' % (rng.choice(months), day, 2018, time_range))
+        else:
+            corpus.append('%s %d %s' % (rng.choice(months), day, time_range))
+    return corpus
+
+
+REPEAT_PHRASES = (
+    '1st and 3rd Wednesdays 8:30pm',
+    '2nd and 4th Mondays 7pm',
+    '1st Fridays 8:30pm-12:30am',
+    '3rd Sundays 2pm-5pm',
+    'Every other Thursday 8-11pm',
+    'Every other Tuesday 6-9pm',
+    'Thursdays 8pm-12am',
+    'Saturdays 10am-2pm',
+    '1st Fridays 20:30-23:30',
+)
+
+
+def draw(rng, pool, size=CORPUS_SIZE):
+    """
+    Build a corpus by drawing strings from a pool of distinct strings.
+    """
+    return [rng.choice(pool) for _ in range(size)]
+
+
+def _cache_mode(mode):
+    """
+    Configure the parse cache for a benchmark: 'hit' runs the corpus with a
+    warm cache, 'miss' disables the cache, and 'mixed' uses a cache smaller
+    than the number of distinct strings in the corpus, so that some lookups
+    miss.
+    """
+    cache_clear()
+    if mode == 'miss':
+        set_cache_size(0)
+    elif mode == 'mixed':
+        set_cache_size(64)
+    else:
+        set_cache_size(DEFAULT_CACHE_SIZE)
+
+
+@benchmark('parse')
+def bench_parse(rng):
+    corpus = draw(rng, single_event_corpus(rng, DISTINCT_STRINGS))
+
+    def run():
+        for value in corpus:
+            parse(value)
+    return run, len(corpus)
+
+
+def _time_range_benchmark(mode):
+    def build(rng):
+        corpus = draw(rng, time_range_corpus(rng, DISTINCT_STRINGS))
+        on_date = date(2018, 6, 1)
+        _cache_mode(mode)
+
+        def run():
+            for value in corpus:
+                parse_time_range(on_date, value, TIME_ZONE)
+        return run, len(corpus)
+    return build
+
+
+def _single_event_benchmark(mode):
+    def build(rng):
+        corpus = draw(rng, single_event_corpus(rng, DISTINCT_STRINGS))
+        _cache_mode(mode)
+
+        def run():
+            for value in corpus:
+                parse_single_event(value, TIME_ZONE, NOW)
+        return run, len(corpus)
+    return build
+
+
+for _mode in ('hit', 'mixed', 'miss'):
+    benchmark('parse_time_range[%s]' % _mode)(_time_range_benchmark(_mode))
+    benchmark('parse_single_event[%s]' % _mode)(_single_event_benchmark(_mode))
+
+
+@benchmark('guess_date')
+def bench_guess_date(rng):
+    month_days = [(rng.randint(1, 12), rng.randint(1, 28)) for _ in range(CORPUS_SIZE)]
+
+    def run():
+        for month, day in month_days:
+            guess_date(month, day, TIME_ZONE, NOW)
+    return run, len(month_days)
+
+
+def _repeat_phrase_benchmark(how_long):
+    def build(rng):
+        phrases = [rng.choice(REPEAT_PHRASES) for _ in range(20)]
+        _cache_mode('hit')
+
+        def run():
+            for phrase in phrases:
+                for _ in parse_repeat_phrase(phrase, how_long, TIME_ZONE, NOW):
+                    pass
+        return run, len(phrases)
+    return build
+
+
+for _label, _how_long in (
+        ('1_month', timedelta(days=31)),
+        ('1_year', timedelta(days=365)),
+        ('10_years', timedelta(days=3652)),
+):
+    benchmark('parse_repeat_phrase[%s]' % _label)(_repeat_phrase_benchmark(_how_long))
+
+
+def measure(build, repeat, min_time):
+    """
+    Run a benchmark, returning the best operations per second over several
+    repetitions, and the peak memory traced while running the corpus once.
+    """
+    run, ops = build(random.Random(SEED))
+    run()  # warm up
+
+    best = None
+    for _ in range(repeat):
+        iterations = 0
+        started = time.perf_counter()
+        while True:
+            run()
+            iterations += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        rate = iterations * ops / elapsed
+        best = rate if best is None else max(best, rate)
+
+    tracemalloc.start()
+    run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'ops_per_sec': best, 'peak_bytes': peak, 'ops': ops}
+
+
+IMPORT_BENCHMARK = 'import_e_time'
+
+
+def _import_microseconds():
+    # -X importtime writes "import time: self [us] | cumulative | package"
+    # to stderr for each module imported, after the modules it imports.
+    output = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import e_time'],
+        cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True,
+        check=True,
+    ).stderr
+    for line in output.splitlines():
+        fields = [field.strip() for field in line.split(':', 1)[-1].split('|')]
+        if len(fields) == 3 and fields[2] == 'e_time':
+            return int(fields[1])
+    raise RuntimeError('e_time not found in -X importtime output:\n' + output)
+
+
+def measure_import_time(repeat):
+    """
+    Measure the cumulative time taken by "import e_time" in fresh
+    interpreters, returning the best of several runs.
+    """
+    best = min(_import_microseconds() for _ in range(repeat))
+    return {'ops_per_sec': 1e6 / best, 'import_us': best, 'ops': 1}
+
+
+def compare(results, baseline, tolerance):
+    """
+    Print the change in operations per second from a baseline, returning the
+    names of benchmarks which are slower by more than the tolerance.
+    """
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name not in baseline:
+            continue
+        ratio = result['ops_per_sec'] / baseline[name]['ops_per_sec']
+        flag = ''
+        if ratio < 1 - tolerance:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print('%-36s %+7.1f%%%s' % (name, (ratio - 1) * 100, flag))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--output', help='write results as JSON to this file')
+    parser.add_argument('--compare', help='compare with results from this JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.10,
+                        help='slowdown allowed by --compare (default 0.10)')
+    parser.add_argument('--filter', default='', help='run only benchmarks containing this')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.2,
+                        help='minimum seconds per repetition')
+    args = parser.parse_args()
+
+    results = {}
+    try:
+        for name, build in BENCHMARKS:
+            if args.filter not in name:
+                continue
+            results[name] = measure(build, args.repeat, args.min_time)
+            print('%-36s %12.0f ops/sec %10d peak bytes' % (
+                name, results[name]['ops_per_sec'], results[name]['peak_bytes']
+            ))
+    finally:
+        set_cache_size(DEFAULT_CACHE_SIZE)
+    if args.filter in IMPORT_BENCHMARK:
+        results[IMPORT_BENCHMARK] = measure_import_time(args.repeat)
+        print('%-36s %12d us' % (IMPORT_BENCHMARK, results[IMPORT_BENCHMARK]['import_us']))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'results': results,
+            }, output, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+        if compare(results, baseline, args.tolerance):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
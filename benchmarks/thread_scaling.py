@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Stress test of parsing from many threads at once.
+
+Each thread parses its own corpus of time ranges with parse_time_ranges_bulk()
+while another thread keeps registering syntaxes in a syntax table that the
+parsing threads also use, and the results are checked against parsing the
+same corpora in one thread.  Throughput is reported for each number of
+threads; on free-threaded builds of CPython it should scale with the number
+of threads (up to the number of CPUs), while with the GIL it stays flat.
+
+Examples:
+
+    python benchmarks/thread_scaling.py
+    python -X gil=0 benchmarks/thread_scaling.py --threads 1 2 4 8 16
+"""
+import argparse
+from datetime import date
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz  # noqa: E402
+
+from e_time import parse_time_ranges_bulk, set_cache_size  # noqa: E402
+from e_time.parser import DEFAULT_CACHE_SIZE, TIME_RANGE_SYNTAX  # noqa: E402
+from e_time.tokens_and_syntax import (  # noqa: E402
+    Comma, evaluate_by_syntax, parse, SyntaxTable,
+)
+
+from run_benchmarks import SEED, time_range_corpus  # noqa: E402
+
+TIME_ZONE = pytz.timezone('US/Eastern')
+ON_DATE = date(2018, 6, 1)
+
+
+def _parse_with_table(table, corpus):
+    return [evaluate_by_syntax(value, parse(value), table) for value in corpus]
+
+
+def _register_forever(table, stop):
+    # Keep publishing new versions of the table while it is being read, at
+    # a rate that doesn't take much time from the parsing threads.
+    count = 1
+    while not stop.wait(0.001):
+        table.register([Comma] * (count + 20), None)
+        count += 1
+
+
+def run(threads, corpora, table):
+    """
+    Parse one corpus per thread, returning the elapsed time and the results.
+    """
+    results = [None] * threads
+    barrier = threading.Barrier(threads + 1)
+
+    def worker(index):
+        barrier.wait()
+        corpus = corpora[index]
+        results[index] = (
+            parse_time_ranges_bulk([ON_DATE] * len(corpus), corpus, TIME_ZONE),
+            _parse_with_table(table, corpus),
+        )
+
+    workers = [threading.Thread(target=worker, args=(index,)) for index in range(threads)]
+    for thread in workers:
+        thread.start()
+    barrier.wait()
+    started = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    return time.perf_counter() - started, results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--items', type=int, default=20000,
+                        help='number of strings parsed by each thread')
+    parser.add_argument('--cache', choices=('hit', 'miss'), default='miss',
+                        help='whether parsed strings are cached (default: miss)')
+    args = parser.parse_args()
+
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print('Python %s, GIL %s, %d CPUs' % (
+        sys.version.split()[0], 'enabled' if is_gil_enabled else 'disabled', os.cpu_count()
+    ))
+
+    rng = random.Random(SEED)
+    max_threads = max(args.threads)
+    corpora = [time_range_corpus(rng, args.items) for _ in range(max_threads)]
+    table = SyntaxTable(TIME_RANGE_SYNTAX)
+    expected = [
+        (
+            parse_time_ranges_bulk([ON_DATE] * len(corpus), corpus, TIME_ZONE),
+            _parse_with_table(table, corpus),
+        )
+        for corpus in corpora
+    ]
+
+    set_cache_size(DEFAULT_CACHE_SIZE if args.cache == 'hit' else 0)
+    stop = threading.Event()
+    registrar = threading.Thread(target=_register_forever, args=(table, stop))
+    registrar.start()
+    base_rate = None
+    failed = False
+    try:
+        for threads in args.threads:
+            elapsed, results = run(threads, corpora, table)
+            if results != expected[:threads]:
+                print('%3d threads: RESULTS DIFFER FROM SERIAL PARSING' % threads)
+                failed = True
+                continue
+            rate = threads * args.items / elapsed
+            if base_rate is None:
+                base_rate = rate / threads
+            speedup = rate / base_rate
+            print('%3d threads %12.0f items/sec %6.2fx speedup %5.0f%% efficiency' % (
+                threads, rate, speedup, 100 * speedup / threads
+            ))
+    finally:
+        stop.set()
+        registrar.join()
+        set_cache_size(DEFAULT_CACHE_SIZE)
+    print('%d syntaxes registered concurrently' % (len(table) - len(TIME_RANGE_SYNTAX)))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,60 @@
 """ Time-parsing utilities """
+from importlib import import_module
+import sys
+
 __version__ = '0.0.15'
 
-from .parser import guess_date, parse_repeat_phrase, parse_single_event, parse_time_range  # noqa
+# Public names and the modules that define them.  A module is imported when
+# one of its names is first used (PEP 562), so importing e_time itself is
+# cheap.
+_EXPORTS = {
+    'cache_clear': 'parser',
+    'cache_info': 'parser',
+    'compile_repeat_phrase': 'parser',
+    'guess_date': 'parser',
+    'next_occurrence_after': 'parser',
+    'ParseContext': 'parser',
+    'parse_repeat_phrase': 'parser',
+    'parse_single_event': 'parser',
+    'parse_time_range': 'parser',
+    'prev_occurrence_before': 'parser',
+    'iter_rules_from_bytes': 'parser',
+    'rule_from_bytes': 'parser',
+    'set_cache_size': 'parser',
+    'ParseError': 'tokens_and_syntax',
+    'iter_compile_repeat_phrases': 'bulk',
+    'iter_parse_single_events': 'bulk',
+    'iter_parse_time_ranges': 'bulk',
+    'ParseFailure': 'bulk',
+    'parse_many': 'bulk',
+    'parse_time_ranges_bulk': 'bulk',
+}
+
+# Submodules, which are also imported when first used as attributes of the
+# package (e.g., e_time.tokens_and_syntax after only "import e_time").
+_SUBMODULES = frozenset((
+    'aio', 'bulk', 'index', 'instrumentation', 'localize', 'parser', 'tokens_and_syntax',
+    'vectorized',
+))
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    if name in _SUBMODULES:
+        return import_module('.' + name, __name__)
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = getattr(import_module('.' + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if sys.version_info < (3, 7):  # module __getattr__ is not supported
+    for _name in __all__:
+        __getattr__(_name)
@@ -0,0 +1,194 @@
+""" Counterparts of the API functions for use in asyncio event loops """
+import asyncio
+from functools import partial
+from itertools import islice
+
+from .bulk import _iter_parse_results, _strip
+from .parser import (
+    _check_context, compile_repeat_phrase, parse_repeat_phrase, parse_single_event,
+    parse_time_range,
+)
+
+# Number of occurrences generated, or strings parsed in the executor, between
+# opportunities for other tasks to run.
+DEFAULT_BATCH_SIZE = 256
+
+
+class _YieldingIterator(object):
+    """
+    Asynchronous iterator over a synchronous iterable, which lets other tasks
+    run after every batch of items.
+    """
+
+    def __init__(self, iterable, batch_size):
+        if batch_size < 1:
+            raise ValueError('batch_size must be at least 1')
+        self._iterator = iter(iterable)
+        self._batch_size = batch_size
+        self._count = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        self._count += 1
+        if self._count > self._batch_size:
+            self._count = 1
+            await asyncio.sleep(0)
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration from None
+
+
+def aiter_repeat_phrase(phrase, how_long, local_tz=None, now=None, batch_size=DEFAULT_BATCH_SIZE,
+                        context=None):
+    """
+    Asynchronously iterate over the occurrences generated by
+    parse_repeat_phrase(), letting other tasks run between batches.
+
+    Example:
+
+    from datetime import timedelta
+    from e_time.aio import aiter_repeat_phrase
+
+    async def occurrences(phrase, local_tz):
+        return [
+            occurrence
+            async for occurrence in aiter_repeat_phrase(phrase, timedelta(days=3650), local_tz)
+        ]
+
+    :param phrase: "1st and 3rd Wednesdays 8:30pm", etc.
+    :param how_long: (timedelta) For how long into the future should
+        occurrences be generated
+    :param local_tz: Optional local timezone (if not provided, naive datetimes
+        will be returned)
+    :param now: Optional current time (if not provided, the current time will
+        be used)
+    :param batch_size: number of occurrences to generate between
+        opportunities for other tasks to run
+    :param context: optional ParseContext, which provides local_tz and now
+    :return: asynchronous iterable of tuples of begin/end datetime
+    """
+    return _YieldingIterator(
+        parse_repeat_phrase(phrase, how_long, local_tz, now, context=context), batch_size
+    )
+
+
+def aiter_occurrences(rule, start, until, local_tz=None, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Asynchronously iterate over the occurrences of a compiled repeat rule
+    within a range of dates, as generated by its occurrences() method,
+    letting other tasks run between batches.
+
+    :param rule: compiled repeat rule, as returned by compile_repeat_phrase()
+    :param start: first datetime.date of the range
+    :param until: datetime.date following the last date of the range
+    :param local_tz: optional pytz or zoneinfo time zone, for building
+        localized times
+    :param batch_size: number of occurrences to generate between
+        opportunities for other tasks to run
+    :return: asynchronous iterable of tuples of start datetime and stop
+        datetime (or None)
+    """
+    return _YieldingIterator(rule.occurrences(start, until, local_tz), batch_size)
+
+
+def _parse_batch(parse_one, values, start):
+    # Runs in the executor; module-level functions and partials of them can
+    # be sent to worker processes.
+    return [result for _, result in _iter_parse_results(values, parse_one, 'yield', start)]
+
+
+def _single_event(line, local_tz, now, context):
+    return parse_single_event(_strip(line), local_tz, now, context=context)
+
+
+def _time_range(item, local_tz, context):
+    return parse_time_range(item[0], _strip(item[1]), local_tz, context=context)
+
+
+def _repeat_phrase(line, context):
+    return compile_repeat_phrase(_strip(line), context)
+
+
+async def _parse_in_batches(values, parse_one, executor, batch_size):
+    if batch_size < 1:
+        raise ValueError('batch_size must be at least 1')
+    loop = asyncio.get_event_loop()
+    iterator = iter(values)
+    results = []
+    while True:
+        batch = list(islice(iterator, batch_size))
+        if not batch:
+            return results
+        results.extend(await loop.run_in_executor(
+            executor, _parse_batch, parse_one, batch, len(results)
+        ))
+
+
+async def parse_single_events(lines, local_tz=None, now=None, executor=None,
+                              batch_size=DEFAULT_BATCH_SIZE, context=None):
+    """
+    Call parse_single_event() for each string from an iterable, in batches
+    run in an executor so that the event loop isn't blocked.
+
+    :param lines: iterable of strings representing event dates and times
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param now: optional datetime from which the year will be extracted
+    :param executor: concurrent.futures executor in which to parse the
+        strings; defaults to the event loop's default executor
+    :param batch_size: number of strings to parse in each call to the executor
+    :param context: optional ParseContext, which provides local_tz and now
+    :return: list with, for each string, either a tuple of start and stop
+        datetime or a ParseFailure
+    """
+    _check_context(context, local_tz, now)
+    return await _parse_in_batches(
+        lines, partial(_single_event, local_tz=local_tz, now=now, context=context), executor,
+        batch_size
+    )
+
+
+async def parse_time_ranges(items, local_tz=None, executor=None, batch_size=DEFAULT_BATCH_SIZE,
+                            context=None):
+    """
+    Call parse_time_range() for each date and string from an iterable, in
+    batches run in an executor so that the event loop isn't blocked.
+
+    :param items: iterable of tuples of datetime.date and the string
+        representing the time range on that date
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param executor: concurrent.futures executor in which to parse the
+        strings; defaults to the event loop's default executor
+    :param batch_size: number of items to parse in each call to the executor
+    :param context: optional ParseContext, which provides local_tz
+    :return: list with, for each item, either a tuple of start and stop
+        datetime or a ParseFailure
+    """
+    _check_context(context, local_tz)
+    return await _parse_in_batches(
+        items, partial(_time_range, local_tz=local_tz, context=context), executor, batch_size
+    )
+
+
+async def compile_repeat_phrases(lines, executor=None, batch_size=DEFAULT_BATCH_SIZE,
+                                 context=None):
+    """
+    Call compile_repeat_phrase() for each string from an iterable, in batches
+    run in an executor so that the event loop isn't blocked.
+
+    :param lines: iterable of repeat phrases
+    :param executor: concurrent.futures executor in which to parse the
+        phrases; defaults to the event loop's default executor
+    :param batch_size: number of phrases to parse in each call to the executor
+    :param context: optional ParseContext, whose cache of parsed strings is
+        used
+    :return: list with, for each phrase, either a compiled rule or a
+        ParseFailure
+    """
+    return await _parse_in_batches(
+        lines, partial(_repeat_phrase, context=context), executor, batch_size
+    )
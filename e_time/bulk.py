@@ -0,0 +1,310 @@
+""" API functions for parsing many time strings at once """
+from itertools import repeat, zip_longest
+import os
+
+from . import parser
+from .parser import (
+    _check_context, _get_now, _time_range_on_date, _time_range_template,
+    compile_repeat_phrase, parse_single_event, parse_time_range,
+)
+
+
+class ParseFailure(object):
+    """
+    Stands in for the result of a single item of a bulk operation that could
+    not be parsed.
+    """
+
+    __slots__ = ('index', 'value', 'error')
+
+    def __init__(self, index, value, error):
+        """
+        :param index: position of the item in the input
+        :param value: the string that could not be parsed
+        :param error: the exception raised for the item
+        """
+        self.index = index
+        self.value = value
+        self.error = error
+
+    def __eq__(self, other):
+        if not isinstance(other, ParseFailure):
+            return NotImplemented
+        return (self.index, self.value, str(self.error)) == \
+            (other.index, other.value, str(other.error))
+
+    def __repr__(self):
+        return 'ParseFailure(%r, %r, %r)' % (self.index, self.value, self.error)
+
+
+_MISSING = object()
+
+
+def _iter_time_ranges(on_dates, time_ranges, local_tz, context):
+    # Each distinct string is parsed once, whether it succeeds or fails.  The
+    # shared cache is looked up here, as set_cache_size() replaces it.
+    if context is None:
+        get_template = parser._get_template  # pylint: disable=protected-access
+    else:
+        get_template = context._get_template  # pylint: disable=protected-access
+        local_tz = context.local_tz
+    templates = {}
+    items = zip_longest(on_dates, time_ranges, fillvalue=_MISSING)
+    for index, (on_date, time_range) in enumerate(items):
+        if on_date is _MISSING or time_range is _MISSING:
+            raise ValueError('%s ran out at index %d' % (
+                'on_dates' if on_date is _MISSING else 'time_ranges', index
+            ))
+        try:
+            template = templates[time_range]
+        except KeyError:
+            try:
+                template = get_template(_time_range_template, time_range)
+            except ValueError as ex:
+                template = ex
+            templates[time_range] = template
+        if isinstance(template, ValueError):
+            result = ParseFailure(index, time_range, template)
+        else:
+            try:
+                result = _time_range_on_date(on_date, time_range, template, local_tz)
+            except ValueError as ex:
+                result = ParseFailure(index, time_range, ex)
+        yield result
+
+
+def parse_time_ranges_bulk(on_dates, time_ranges, local_tz=None, lazy=False, context=None):
+    """
+    This function is the equivalent of calling parse_time_range() for each
+    pair of date and time range string, but parses each distinct string only
+    once.  Items that can't be parsed are represented by a ParseFailure in the
+    result rather than raising an exception.
+
+    Example:
+
+    from datetime import date
+    import pytz
+    from e_time import parse_time_ranges_bulk
+    us_eastern = pytz.timezone('US/Eastern')
+
+    results = parse_time_ranges_bulk(
+        [date(2018, 1, 15), date(2018, 1, 16)], ['9pm-12am', '9pm-12am'], local_tz=us_eastern
+    )
+
+    :param on_dates: sequence of datetime.date indicating the applicable dates
+    :param time_ranges: sequence of strings representing the time ranges,
+        parallel to on_dates; if either is an iterator, ValueError is raised
+        when one runs out before the other
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param lazy: if True, return a generator instead of a list
+    :param context: optional ParseContext, which provides local_tz
+    :return: list (or generator) with, for each item, either a tuple of start
+        and stop datetime (stop may be None) or a ParseFailure
+    """
+    _check_context(context, local_tz)
+    if hasattr(on_dates, '__len__') and hasattr(time_ranges, '__len__') and \
+            len(on_dates) != len(time_ranges):
+        raise ValueError('%d dates were provided for %d time ranges' % (
+            len(on_dates), len(time_ranges)
+        ))
+    results = _iter_time_ranges(on_dates, time_ranges, local_tz, context)
+    if lazy:
+        return results
+    return list(results)
+
+
+_ON_ERROR_CHOICES = ('yield', 'skip', 'raise')
+
+
+def _iter_parse(values, parse_one, on_error):
+    if on_error not in _ON_ERROR_CHOICES:
+        raise ValueError('on_error must be one of %s' % ', '.join(_ON_ERROR_CHOICES))
+    return _iter_parse_results(values, parse_one, on_error)
+
+
+def _iter_parse_results(values, parse_one, on_error, start=0):
+    for index, value in enumerate(values, start):
+        try:
+            result = parse_one(value)
+        except ValueError as ex:
+            if on_error == 'raise':
+                raise
+            if on_error == 'skip':
+                continue
+            result = ParseFailure(index, value, ex)
+        yield index, result
+
+
+def _strip(line):
+    # Lines read from files keep their line endings.
+    return line.strip()
+
+
+def iter_parse_single_events(lines, local_tz=None, now=None, on_error='yield', context=None):
+    """
+    This generator calls parse_single_event() for each string from an
+    iterable, such as an open file, consuming the iterable lazily.
+
+    :param lines: iterable of strings representing event dates and times
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param now: optional datetime from which the year will be extracted
+    :param on_error: what to do with a string that can't be parsed: 'yield' a
+        ParseFailure in place of the result, 'skip' it, or 'raise' the
+        exception
+    :param context: optional ParseContext, which provides local_tz and now
+    :return: iterable of tuples of the index of the string and either a tuple
+        of start and stop datetime or a ParseFailure
+    """
+    _check_context(context, local_tz, now)
+    return _iter_parse(
+        lines,
+        lambda line: parse_single_event(
+            _strip(line), local_tz=local_tz, now=now, context=context
+        ),
+        on_error
+    )
+
+
+def iter_parse_time_ranges(items, local_tz=None, on_error='yield', context=None):
+    """
+    This generator calls parse_time_range() for each date and string from an
+    iterable, consuming the iterable lazily.
+
+    :param items: iterable of tuples of datetime.date and the string
+        representing the time range on that date
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param on_error: what to do with an item that can't be parsed: 'yield' a
+        ParseFailure in place of the result, 'skip' it, or 'raise' the
+        exception
+    :param context: optional ParseContext, which provides local_tz
+    :return: iterable of tuples of the index of the item and either a tuple
+        of start and stop datetime or a ParseFailure
+    """
+    _check_context(context, local_tz)
+    return _iter_parse(
+        items,
+        lambda item: parse_time_range(item[0], _strip(item[1]), local_tz, context=context),
+        on_error
+    )
+
+
+def iter_compile_repeat_phrases(lines, on_error='yield', context=None):
+    """
+    This generator calls compile_repeat_phrase() for each string from an
+    iterable, such as an open file, consuming the iterable lazily.
+
+    :param lines: iterable of repeat phrases
+    :param on_error: what to do with a phrase that can't be parsed: 'yield' a
+        ParseFailure in place of the result, 'skip' it, or 'raise' the
+        exception
+    :param context: optional ParseContext, whose cache of parsed strings is
+        used
+    :return: iterable of tuples of the index of the phrase and either a
+        compiled rule or a ParseFailure
+    """
+    return _iter_parse(
+        lines, lambda line: compile_repeat_phrase(_strip(line), context), on_error
+    )
+
+
+_TZ_BACKENDS = ('pytz', 'zoneinfo')
+
+
+def _get_time_zone(tz_name, tz_backend):
+    # Neither time zone module is imported unless a time zone is needed.
+    # pylint: disable=import-outside-toplevel
+    if tz_name is None:
+        return None
+    if tz_backend == 'zoneinfo':
+        import zoneinfo
+        return zoneinfo.ZoneInfo(tz_name)
+    import pytz
+    return pytz.timezone(tz_name)
+
+
+_PARSE_MANY_KINDS = {
+    'single_event': lambda value, local_tz, now: parse_single_event(value, local_tz, now),
+    'repeat_phrase': lambda value, local_tz, now: compile_repeat_phrase(value),
+}
+
+
+def _parse_chunk(kind, values, tz_name, tz_backend, now):
+    # Runs in the worker processes; the time zone is passed by name so that it
+    # is only looked up once per chunk.
+    parse_one = _PARSE_MANY_KINDS[kind]
+    local_tz = _get_time_zone(tz_name, tz_backend)
+    results = []
+    for value in values:
+        try:
+            results.append(parse_one(value, local_tz, now))
+        except ValueError as ex:
+            results.append(ex)
+    return results
+
+
+def parse_many(values, kind='single_event', tz_name=None, now=None, workers=None,
+               chunksize=None, tz_backend='pytz'):
+    """
+    This function parses many strings using a pool of worker processes.
+    Each distinct string is parsed only once, and the results are returned in
+    the order of the input.  Strings that can't be parsed are represented by a
+    ParseFailure in the result.
+
+    :param values: sequence of strings to parse
+    :param kind: 'single_event' to call parse_single_event() for each string,
+        or 'repeat_phrase' to call compile_repeat_phrase() for each string
+    :param tz_name: optional name of the time zone to use for building
+        localized times, such as 'US/Eastern'
+    :param now: optional datetime from which the year will be extracted; if
+        not provided, the current time is read once and used for all strings
+    :param workers: number of worker processes; defaults to the number of
+        CPUs, and 0 parses the strings in the calling process
+    :param chunksize: number of distinct strings to send to a worker at a time
+    :param tz_backend: 'pytz' or 'zoneinfo', the module used to look up
+        tz_name
+    :return: list with, for each string, the result of parsing it or a
+        ParseFailure
+    """
+    if kind not in _PARSE_MANY_KINDS:
+        raise ValueError('kind must be one of %s' % ', '.join(sorted(_PARSE_MANY_KINDS)))
+    if tz_backend not in _TZ_BACKENDS:
+        raise ValueError('tz_backend must be one of %s' % ', '.join(_TZ_BACKENDS))
+    if now is None and kind == 'single_event':
+        now = _get_now(_get_time_zone(tz_name, tz_backend))
+
+    unique_values = list(dict.fromkeys(values))
+    if workers == 0:
+        unique_results = _parse_chunk(kind, unique_values, tz_name, tz_backend, now)
+    else:
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if chunksize is None:
+            chunksize = max(1, len(unique_values) // (workers * 4))
+        chunks = [
+            unique_values[i:i + chunksize]
+            for i in range(0, len(unique_values), chunksize)
+        ]
+        # Imported here, since it is costly and only needed by parse_many().
+        # pylint: disable=import-outside-toplevel
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            unique_results = [
+                result
+                for chunk_results in executor.map(
+                    _parse_chunk,
+                    repeat(kind), chunks, repeat(tz_name), repeat(tz_backend), repeat(now)
+                )
+                for result in chunk_results
+            ]
+
+    results_by_value = dict(zip(unique_values, unique_results))
+    results = []
+    for index, value in enumerate(values):
+        result = results_by_value[value]
+        if isinstance(result, ValueError):
+            result = ParseFailure(index, value, result)
+        results.append(result)
+    return results
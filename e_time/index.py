@@ -0,0 +1,200 @@
+""" Index of repeat rules and single events for finding occurrences in a window """
+from datetime import timedelta
+
+from .parser import _DaysRepeatPerWeek, _DaysRepeatPerWeekOfMonth, _get_now, _time_range_on_date
+
+_ONE_DAY = timedelta(days=1)
+
+
+def _overlaps(starts_at, stops_at, start, end):
+    # Occurrences without a stop time (or with a stop time which isn't after
+    # the start time) are treated as instants.
+    if stops_at is None or stops_at <= starts_at:
+        return start <= starts_at < end
+    return starts_at < end and start < stops_at
+
+
+def _in_progress(starts_at, stops_at, t):
+    if stops_at is None or stops_at <= starts_at:
+        return starts_at == t
+    return starts_at <= t < stops_at
+
+
+class RecurrenceIndex(object):
+    """
+    Index compiled repeat rules (as returned by compile_repeat_phrase()) and
+    single events (as returned by parse_single_event()) by the days on which
+    they can occur, so that finding the occurrences in a window of time only
+    builds datetimes for the rules which occur on the days of the window:
+    rules which repeat on certain weeks of the month are indexed by day of
+    the week and week of the month, rules which repeat every so many weeks
+    by day of the week, and single events by date.
+
+    Items are added and removed by key (e.g., the id of a listing), so an
+    index can be kept up to date as listings change.
+
+    Example:
+
+    from datetime import datetime
+    import pytz
+    from e_time import compile_repeat_phrase, parse_single_event
+    from e_time.index import RecurrenceIndex
+    us_eastern = pytz.timezone('US/Eastern')
+    index = RecurrenceIndex(us_eastern)
+    start = us_eastern.localize(datetime(2018, 1, 17, 20))
+    end = us_eastern.localize(datetime(2018, 1, 18))
+    index.add('trivia', compile_repeat_phrase('1st and 3rd Wednesdays 8:30pm'))
+    index.add('concert', parse_single_event('january 17 9-11pm', us_eastern, start))
+    for key, starts_at, stops_at in index.overlapping(start, end):
+        print(key, starts_at, stops_at)
+    """
+
+    def __init__(self, local_tz=None):
+        """
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; times passed to queries and single events must
+            be localized in this time zone if it is provided, and naive
+            otherwise
+        """
+        self.local_tz = local_tz
+        self._by_week_of_month = {}  # (day of week, week of month) -> {key: rule}
+        self._by_day_of_week = {}  # day of week -> {key: (rule, first ordinal)}
+        self._by_date = {}  # date -> {key: (start datetime, stop datetime)}
+        self._locations = {}  # key -> list of (bucket dict, bucket key)
+
+    def __len__(self):
+        return len(self._locations)
+
+    def __contains__(self, key):
+        return key in self._locations
+
+    def _put(self, key, buckets, bucket_key, entry):
+        buckets.setdefault(bucket_key, {})[key] = entry
+        self._locations[key].append((buckets, bucket_key))
+
+    def add(self, key, item, anchor=None):
+        """
+        Add a repeat rule or a single event to the index.
+
+        :param key: hashable key identifying the item
+        :param item: compiled repeat rule, or tuple of start datetime and stop
+            datetime (or None) of a single event
+        :param anchor: for rules which repeat every so many weeks, the
+            datetime.date on or after which the repetition starts, which
+            determines the weeks of the occurrences (they continue before it
+            as well); defaults to the current date
+        :raises ValueError: if the key is already in the index
+        :raises TypeError: if the item is an unsupported rule
+        """
+        if key in self._locations:
+            raise ValueError('Key %r is already in the index' % (key,))
+        self._locations[key] = []
+        try:
+            if isinstance(item, _DaysRepeatPerWeekOfMonth):
+                for occurrence in set(item.occurrences_of_day):
+                    if 1 <= occurrence <= 5:
+                        self._put(
+                            key, self._by_week_of_month, (item.day_of_week, occurrence), item
+                        )
+            elif isinstance(item, _DaysRepeatPerWeek):
+                if anchor is None:
+                    anchor = _get_now(self.local_tz).date()
+                self._put(
+                    key, self._by_day_of_week, item.day_of_week,
+                    (item, item._first_ordinal(anchor))  # pylint: disable=protected-access
+                )
+            elif isinstance(item, tuple) and len(item) == 2:
+                starts_at, stops_at = item
+                day = starts_at.date()
+                last_day = stops_at.date() if stops_at is not None else day
+                while True:
+                    self._put(key, self._by_date, day, item)
+                    if day >= last_day:
+                        break
+                    day += _ONE_DAY
+            else:
+                raise TypeError('Unsupported item %r' % (item,))
+        except Exception:
+            self.remove(key)
+            raise
+
+    def remove(self, key):
+        """
+        Remove an item from the index.
+
+        :param key: key of the item
+        :raises KeyError: if the key is not in the index
+        """
+        for buckets, bucket_key in self._locations.pop(key):
+            bucket = buckets[bucket_key]
+            del bucket[key]
+            if not bucket:
+                del buckets[bucket_key]
+
+    def _rule_occurrences_on(self, day):
+        """
+        Generate the key, start time and stop time of each occurrence of a
+        rule which starts on a date.
+        """
+        day_of_week = day.weekday()
+        week_of_month = (day.day - 1) // 7 + 1
+        for key, rule in self._by_week_of_month.get((day_of_week, week_of_month), {}).items():
+            yield (key,) + _time_range_on_date(
+                day, rule.time_range, rule.hours_and_minutes, self.local_tz
+            )
+        ordinal = day.toordinal()
+        for key, (rule, first_ordinal) in self._by_day_of_week.get(day_of_week, {}).items():
+            if (ordinal - first_ordinal) % rule.days_between == 0:
+                yield (key,) + _time_range_on_date(
+                    day, rule.time_range, rule.hours_and_minutes, self.local_tz
+                )
+
+    def _occurrences_from(self, first_day, last_day):
+        # Occurrences of rules last less than a day, so starting a day early
+        # finds those which continue past midnight into the window.  Single
+        # events are indexed under every date they cover, so they are
+        # reported the first time they are seen.
+        seen_events = set()
+        day = first_day - _ONE_DAY
+        while day <= last_day:
+            yield from self._rule_occurrences_on(day)
+            for key, (starts_at, stops_at) in self._by_date.get(day, {}).items():
+                if key not in seen_events:
+                    seen_events.add(key)
+                    yield key, starts_at, stops_at
+            day += _ONE_DAY
+
+    def overlapping(self, start, end):
+        """
+        Find the occurrences which overlap a window of time.  Occurrences
+        without a stop time overlap the window if they start within it.
+
+        :param start: datetime at which the window starts
+        :param end: datetime at which the window ends (not included)
+        :return: list of tuples of key, start datetime and stop datetime (or
+            None), in order of start time
+        """
+        if end <= start:
+            return []
+        found = [
+            occurrence for occurrence in self._occurrences_from(start.date(), end.date())
+            if _overlaps(occurrence[1], occurrence[2], start, end)
+        ]
+        found.sort(key=lambda occurrence: occurrence[1])
+        return found
+
+    def at(self, t):
+        """
+        Find the occurrences in progress at a time.  Occurrences without a
+        stop time are in progress only at their start time.
+
+        :param t: datetime
+        :return: list of tuples of key, start datetime and stop datetime (or
+            None), in order of start time
+        """
+        found = [
+            occurrence for occurrence in self._occurrences_from(t.date(), t.date())
+            if _in_progress(occurrence[1], occurrence[2], t)
+        ]
+        found.sort(key=lambda occurrence: occurrence[1])
+        return found
@@ -0,0 +1,184 @@
+""" Optional counters and timings for the stages of parsing """
+import threading
+from time import perf_counter
+
+from . import parser, tokens_and_syntax
+
+# Stages of parsing which are timed.  Stages may be nested; for example, the
+# time spent guessing a year includes the time spent localizing "now".  The
+# syntax stage is the lookup of tokens in a syntax table, which happens once
+# for each table consulted.
+STAGES = ('tokenize', 'classify', 'syntax', 'guess_year', 'localize')
+
+NO_MATCH = '(no match)'
+
+_lock = threading.Lock()
+_hook = None
+_originals = None
+_stage_calls = dict.fromkeys(STAGES, 0)
+_stage_ns = dict.fromkeys(STAGES, 0)
+_syntax_hits = {}
+
+
+def _record(stage, seconds):
+    elapsed_ns = int(seconds * 1e9)
+    with _lock:
+        _stage_calls[stage] += 1
+        _stage_ns[stage] += elapsed_ns
+    hook = _hook
+    if hook is not None:
+        hook(stage, elapsed_ns)
+
+
+def _timed(stage, func):
+    def timed(*args, **kwargs):
+        started = perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _record(stage, perf_counter() - started)
+    return timed
+
+
+def _timed_tokenize(get_token):
+    # The tokenizer is a generator consumed while classifying; run it to
+    # completion so that the two stages are timed separately.
+    def tokenize(string):
+        started = perf_counter()
+        try:
+            tokens = list(get_token(string))
+        finally:
+            _record('tokenize', perf_counter() - started)
+        return iter(tokens)
+    return tokenize
+
+
+def _counted_lookup(lookup):
+    # Every syntax table is consulted through lookup(), including by parsers
+    # which don't call evaluate_by_syntax(), so the syntax stage is timed here.
+    def counted_lookup(table, tokens):
+        started = perf_counter()
+        try:
+            value = lookup(table, tokens)
+        finally:
+            _record('syntax', perf_counter() - started)
+        if value is None:
+            syntax = NO_MATCH
+        else:
+            syntax = ' '.join(token[0].__name__ for token in tokens)
+        with _lock:
+            counts = _syntax_hits.setdefault(table.name or 'unnamed', {})
+            counts[syntax] = counts.get(syntax, 0) + 1
+        return value
+    return counted_lookup
+
+
+# The functions which implement each stage are looked up in their modules
+# when called, so instrumentation replaces them with wrappers while it is
+# enabled and restores them when it is disabled.  Nothing is checked or
+# counted while it is disabled.
+_WRAPPERS = (
+    (tokens_and_syntax, '_get_token', _timed_tokenize),
+    (tokens_and_syntax, '_get_most_specific', lambda func: _timed('classify', func)),
+    (parser, '_guess_year', lambda func: _timed('guess_year', func)),
+    (parser, '_localize', lambda func: _timed('localize', func)),
+    (tokens_and_syntax.SyntaxTable, 'lookup', _counted_lookup),
+)
+
+
+def enable(hook=None):
+    """
+    Start counting and timing the stages of parsing.  Counters accumulate
+    until reset() is called, including across calls to disable() and
+    enable().
+
+    :param hook: optional function called as hook(stage, elapsed_ns) each
+        time a stage completes, e.g., to export timings to a metrics system;
+        it is called in the thread which did the parsing
+    """
+    global _hook, _originals  # pylint: disable=global-statement
+    with _lock:
+        _hook = hook
+        if _originals is not None:
+            return
+        _originals = []
+        for owner, name, wrap in _WRAPPERS:
+            original = getattr(owner, name)
+            _originals.append((owner, name, original))
+            setattr(owner, name, wrap(original))
+
+
+def disable():
+    """
+    Stop counting and timing the stages of parsing.
+    """
+    global _hook, _originals  # pylint: disable=global-statement
+    with _lock:
+        _hook = None
+        if _originals is None:
+            return
+        for owner, name, original in _originals:
+            setattr(owner, name, original)
+        _originals = None
+
+
+def is_enabled():
+    """
+    :return: whether the stages of parsing are being counted and timed
+    """
+    return _originals is not None
+
+
+def reset():
+    """
+    Set all stage and syntax counters to zero.
+    """
+    with _lock:
+        for stage in STAGES:
+            _stage_calls[stage] = 0
+            _stage_ns[stage] = 0
+        _syntax_hits.clear()
+
+
+def stats():
+    """
+    Take a snapshot of the counters.
+
+    Example:
+
+    from e_time import instrumentation, parse_time_range
+    instrumentation.enable()
+    ...
+    snapshot = instrumentation.stats()
+    tokenize_ns = snapshot['stages']['tokenize']['ns']
+
+    :return: dictionary with these items:
+        * 'enabled': whether counting is enabled
+        * 'stages': for each stage in STAGES, a dictionary with the number of
+          'calls' and the cumulative time in 'ns'
+        * 'cache': statistics of the cache of parsed strings ('hits',
+          'misses', 'maxsize', 'currsize', and 'hit_ratio', which is None
+          before any lookup); these are counted whether or not
+          instrumentation is enabled, since the cache was last cleared
+        * 'syntax': for each syntax table by name, the number of lookups of
+          each syntax (token type names separated by spaces), with lookups
+          which matched no syntax counted under NO_MATCH
+    """
+    cache = parser.cache_info()
+    lookups = cache.hits + cache.misses
+    with _lock:
+        return {
+            'enabled': is_enabled(),
+            'stages': {
+                stage: {'calls': _stage_calls[stage], 'ns': _stage_ns[stage]}
+                for stage in STAGES
+            },
+            'cache': {
+                'hits': cache.hits,
+                'misses': cache.misses,
+                'maxsize': cache.maxsize,
+                'currsize': cache.currsize,
+                'hit_ratio': cache.hits / lookups if lookups else None,
+            },
+            'syntax': {name: dict(counts) for name, counts in _syntax_hits.items()},
+        }
@@ -0,0 +1,121 @@
+""" Localization of naive datetimes with a cache of UTC offsets per local date """
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+_USE_DEFAULT = object()
+
+
+class CachedTimeZone(object):
+    """
+    Wrap a pytz time zone so that localize() looks up the UTC offset of each
+    local date once, instead of searching the time zone's transitions for
+    every datetime.  An instance can be passed as local_tz to any function of
+    this library, and other attributes are those of the wrapped time zone.
+
+    On dates without a transition, localize() returns exactly what the
+    wrapped time zone's localize() returns.  On a date with a transition
+    (e.g., the start or end of daylight saving time), localize() calls the
+    wrapped time zone's localize() with the is_dst given to the constructor.
+    With the default is_dst=False, ambiguous times (which occur twice) are
+    resolved to standard time, and non-existent times (which are skipped) are
+    given the standard time offset, just as pytz does by default; is_dst=True
+    prefers daylight saving time, and is_dst=None raises pytz's
+    AmbiguousTimeError or NonExistentTimeError.
+
+    Example:
+
+    from datetime import timedelta
+    import pytz
+    from e_time import parse_repeat_phrase
+    from e_time.localize import CachedTimeZone
+    us_eastern = CachedTimeZone(pytz.timezone('US/Eastern'))
+    occurrences = list(parse_repeat_phrase('Thursdays 8pm-12am', timedelta(days=365), us_eastern))
+    """
+
+    def __init__(self, time_zone, is_dst=False, maxsize=4096):
+        """
+        :param time_zone: pytz time zone
+        :param is_dst: how to resolve times on dates with a transition, as
+            for pytz's localize()
+        :param maxsize: maximum number of local dates for which to keep the
+            offset
+        """
+        self.time_zone = time_zone
+        self.is_dst = is_dst
+        self._local_transition_times = []
+        self._transition_dates = frozenset()
+        transition_times = getattr(time_zone, '_utc_transition_times', None)
+        if transition_times:
+            self._find_transitions(transition_times, time_zone._transition_info)
+        self._tzinfo_by_interval = {}
+        self._tzinfo_for_date = lru_cache(maxsize=maxsize)(self._find_tzinfo_for_date)
+
+    def _find_transitions(self, utc_transition_times, transition_info):
+        # For each transition, the local time at which the new offset starts
+        # to apply, and the local dates on which times may be ambiguous or
+        # non-existent because of the transition.
+        transition_dates = set()
+        previous_offset = transition_info[0][0]
+        for utc_time, (offset, _, _) in zip(utc_transition_times, transition_info):
+            if utc_time == datetime.min:  # pytz's placeholder for the first offset
+                self._local_transition_times.append(utc_time)
+                continue
+            self._local_transition_times.append(utc_time + offset)
+            # Even if only the name of the time zone changes, the tzinfo does.
+            first = (utc_time + min(offset, previous_offset)).date()
+            last = (utc_time + max(offset, previous_offset)).date()
+            while first <= last:
+                transition_dates.add(first)
+                first += timedelta(days=1)
+            previous_offset = offset
+        self._transition_dates = frozenset(transition_dates)
+
+    def _find_tzinfo_for_date(self, local_date):
+        if local_date in self._transition_dates:
+            return None
+        noon = datetime(local_date.year, local_date.month, local_date.day, 12)
+        interval = max(bisect_right(self._local_transition_times, noon) - 1, 0)
+        tzinfo = self._tzinfo_by_interval.get(interval)
+        if tzinfo is None:
+            tzinfo = self.time_zone.localize(noon).tzinfo
+            self._tzinfo_by_interval[interval] = tzinfo
+        return tzinfo
+
+    def localize(self, dt, is_dst=_USE_DEFAULT):
+        """
+        Convert a naive datetime to a localized datetime, like pytz's
+        localize().
+
+        :param dt: naive datetime
+        :param is_dst: optional override of the is_dst given to the
+            constructor, only relevant on dates with a transition
+        :return: localized datetime
+        """
+        if dt.tzinfo is not None:
+            raise ValueError('Not naive datetime (tzinfo is already set)')
+        tzinfo = self._tzinfo_for_date(dt.date())
+        if tzinfo is None:
+            if is_dst is _USE_DEFAULT:
+                is_dst = self.is_dst
+            return self.time_zone.localize(dt, is_dst=is_dst)
+        return dt.replace(tzinfo=tzinfo)
+
+    def cache_info(self):
+        """
+        Report statistics for the cache of offsets per local date.
+
+        :return: functools-style CacheInfo named tuple
+        """
+        return self._tzinfo_for_date.cache_info()
+
+    def __getattr__(self, name):
+        if name == 'time_zone':  # not yet set
+            raise AttributeError(name)
+        return getattr(self.time_zone, name)
+
+    def __repr__(self):
+        return 'CachedTimeZone(%r)' % (self.time_zone,)
+
+    def __str__(self):
+        return str(self.time_zone)
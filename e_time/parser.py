@@ -1,17 +1,82 @@
 """ Implementation of API functions for parsing time strings """
 from datetime import date, datetime, timedelta
+from functools import lru_cache
+import struct
+from weakref import WeakSet
 
+from .localize import CachedTimeZone
 from .tokens_and_syntax import (
     AmPm, Comma, Dash, Day, Days, evaluate_by_syntax, Midnight, Month, Noon,
-    Number, parse, String, Whitespace,
+    Number, parse, ParseError, String, SyntaxTable, Whitespace,
 )
 
 
+def _localize(naive, local_tz):
+    # pytz time zones (and CachedTimeZone) must be applied with localize();
+    # other tzinfo implementations, such as zoneinfo, are simply attached.
+    localize = getattr(local_tz, 'localize', None)
+    if localize is not None:
+        return localize(naive)
+    return naive.replace(tzinfo=local_tz)
+
+
 def _get_now(local_tz=None, now=None):
     if now:
         return now
     now = datetime.now()
-    return local_tz.localize(now) if local_tz else now
+    return _localize(now, local_tz) if local_tz else now
+
+
+DEFAULT_CACHE_SIZE = 1024
+
+
+def _build_template(builder, string):
+    return builder(string)
+
+
+_get_template = lru_cache(maxsize=DEFAULT_CACHE_SIZE)(_build_template)
+# ParseContext objects with caches of their own, for _clear_all_caches()
+_context_caches = WeakSet()
+
+
+def cache_info():
+    """
+    Report statistics for the cache of parsed strings used by
+    parse_time_range(), parse_single_event() and parse_repeat_phrase().
+    Only the date-independent part of parsing is cached; dates, the current
+    time and time zones are applied on every call.
+
+    :return: functools-style CacheInfo named tuple
+    """
+    return _get_template.cache_info()
+
+
+def cache_clear():
+    """
+    Remove all entries from the cache of parsed strings.
+    """
+    _get_template.cache_clear()
+
+
+def _clear_all_caches():
+    """
+    Remove all parsed strings from the shared cache and the caches of
+    contexts, e.g., when the way words are classified has changed.
+    """
+    cache_clear()
+    for context in list(_context_caches):
+        context._cache.cache_clear()  # pylint: disable=protected-access
+
+
+def set_cache_size(maxsize):
+    """
+    Replace the cache of parsed strings with an empty one of a different size.
+
+    :param maxsize: maximum number of parsed strings to keep; 0 disables
+        caching and None removes the bound
+    """
+    global _get_template  # pylint: disable=global-statement
+    _get_template = lru_cache(maxsize=maxsize)(_build_template)
 
 
 def _guess_year(month, day, local_tz, now):
@@ -19,7 +84,7 @@ def _guess_year(month, day, local_tz, now):
     # If using now.year doesn't work due to leap year considerations,
     # we couldn't guess the year anyway.
     then = datetime(now.year, month, day)
-    then = local_tz.localize(then) if local_tz else then
+    then = _localize(then, local_tz) if local_tz else then
     delta = timedelta(days=9*30)
     if now - then > delta:
         return now.year + 1
@@ -28,7 +93,12 @@ def _guess_year(month, day, local_tz, now):
     return now.year
 
 
-def guess_date(month, day, local_tz=None, now=None):
+def _check_context(context, local_tz, now=None):
+    if context is not None and (local_tz is not None or now is not None):
+        raise ValueError('local_tz and now are taken from the context')
+
+
+def guess_date(month, day, local_tz=None, now=None, context=None):
     """
     guess_date() builds a date from the provided month and day by guessing the
     year.
@@ -37,34 +107,28 @@ def guess_date(month, day, local_tz=None, now=None):
     :param day:
     :param local_tz:
     :param now:
+    :param context: optional ParseContext, which provides local_tz and now
     :return: datetime.date with the provided month and day and the guessed year.
     """
+    if context is not None:
+        _check_context(context, local_tz, now)
+        return context.guess_date(month, day)
     year = _guess_year(month, day, local_tz, now)
     return date(year, month, day)
 
 
-def _convert_date(parsed_date, local_tz=None, now=None):
-    month = parsed_date[0]
-    day = parsed_date[1]
-
-    month = Month.get_month_number(month[1])
-    day = int(day[1])
+def _convert_date(parsed_date):
+    month = parsed_date[0].ordinal
+    day = parsed_date[1].number
 
     if len(parsed_date) > 2:
-        year = int(parsed_date[-1][1])
+        year = parsed_date[-1].number
     else:
-        year = _guess_year(month, day, local_tz, now)
+        year = None  # must be guessed
 
     return month, day, year
 
 
-def _convert_time(time):
-    values = list(map(int, time.split(':')))
-    if len(values) == 1:
-        return values[0], 0
-    return values[0], values[1]
-
-
 def _combine_date_times(month, day, year, start_hour, start_minute, stop_hour, stop_minute):
     starts_at_naive = datetime(year, month, day, start_hour, start_minute)
     if stop_hour is not None:
@@ -74,7 +138,22 @@ def _combine_date_times(month, day, year, start_hour, start_minute, stop_hour, s
     return starts_at_naive, stops_at_naive
 
 
-def parse_single_event(when, local_tz=None, now=None):
+# Syntaxes supported by parse_single_event(), with the number of leading
+# date fields for each
+SINGLE_EVENT_SYNTAX = SyntaxTable((
+    ([Month, Number, Number, Dash, Number, AmPm], 2),
+    ([Month, Number, Number, AmPm], 2),
+    ([Month, Number, Number, Number, Dash, Number, AmPm], 3),
+    ([Month, Number, Number, AmPm, Dash, Number, AmPm], 2),
+    ([Month, Number, Number, Number, AmPm, Dash, Number, AmPm], 3),
+    ([Month, Number, Number, Number, AmPm], 3),
+    ([Month, Number, Comma, Number, Number, Dash, Number, AmPm], 4),
+    ([Month, Number, Comma, Number, Number, AmPm, Dash, Number, AmPm], 4),
+    ([Month, Number, Comma, Number, Number, AmPm], 4),
+), name='single_event')
+
+
+def parse_single_event(when, local_tz=None, now=None, context=None):
     """
     This function parses a text string describing a single time range on a
     specified date, returning a tuple of start and end times
@@ -92,51 +171,52 @@ def parse_single_event(when, local_tz=None, now=None):
     starts_at, ends_at = parse_single_event('january 13 9-11pm', local_tz=us_eastern)
 
     :param when: string representing the event date and time or time range
-    :param local_tz: optional pytz time zone, for building localized times
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
     :param now: optional datetime from which the year will be extracted
+    :param context: optional ParseContext, which provides local_tz and now
     :return: datetime for start time, None or datetime for stop time
     """
-    parsed = parse(when)
+    if context is not None:
+        _check_context(context, local_tz, now)
+        return context.parse_single_event(when)
+    month, day, year, times = _get_template(_single_event_template, when)
+    if year is None:
+        year = _guess_year(month, day, local_tz, now)
+    return _single_event_times(month, day, year, times, local_tz)
 
-    syntax = [t for t, _ in parsed]
+
+def _single_event_times(month, day, year, times, local_tz):
+    starts_at, ends_at = _combine_date_times(month, day, year, *times)
+    if local_tz is not None:
+        starts_at = _localize(starts_at, local_tz)
+        if ends_at is not None:
+            ends_at = _localize(ends_at, local_tz)
+    return starts_at, ends_at
+
+
+def _single_event_template(when):
+    parsed = parse(when)
 
     # Parsed fields better be some number of date fields followed by time
     # time fields (and nothing else); check for allowed syntaxes, and find
     # the split between date and time fields.
-    num_date_field_table = (
-        ([Month, Number, Number, Dash, Number, AmPm], 2),
-        ([Month, Number, Number, AmPm], 2),
-        ([Month, Number, Number, Number, Dash, Number, AmPm], 3),
-        ([Month, Number, Number, AmPm, Dash, Number, AmPm], 2),
-        ([Month, Number, Number, Number, AmPm, Dash, Number, AmPm], 3),
-        ([Month, Number, Number, Number, AmPm], 3),
-        ([Month, Number, Comma, Number, Number, Dash, Number, AmPm], 4),
-        ([Month, Number, Comma, Number, Number, AmPm, Dash, Number, AmPm], 4),
-        ([Month, Number, Comma, Number, Number, AmPm], 4),
-    )
-
-    for if_syntax, then_num_date_fields in num_date_field_table:
-        if syntax == if_syntax:
-            num_date_fields = then_num_date_fields
-            break
-    else:
-        raise ValueError('Date/time string "%s" has unexpected syntax' % when)
+    num_date_fields = SINGLE_EVENT_SYNTAX.lookup(parsed)
+    if num_date_fields is None:
+        raise SINGLE_EVENT_SYNTAX.error(
+            'Date/time string "%s" has unexpected syntax' % when, parsed
+        )
 
     parsed_date = parsed[:num_date_fields]
     parsed_time = parsed[num_date_fields:]
 
-    month, day, year = _convert_date(parsed_date, local_tz=local_tz, now=now)
+    month, day, year = _convert_date(parsed_date)
     times = _get_start_stop_hour_minute(parsed_time, when)
-    starts_at, ends_at = _combine_date_times(month, day, year, *times)
-    if local_tz is not None:
-        starts_at = local_tz.localize(starts_at)
-        if ends_at is not None:
-            ends_at = local_tz.localize(ends_at)
-    return starts_at, ends_at
+    return month, day, year, times
 
 
-def _to_24hr(indicator, hour):
-    if AmPm.is_pm(indicator):
+def _to_24hr(is_pm, hour):
+    if is_pm:
         if hour != 12:
             hour += 12
     elif hour == 12:  # 12am
@@ -144,104 +224,74 @@ def _to_24hr(indicator, hour):
     return hour
 
 
-def _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value=None, stop_indicator_value=None
-):
-    start_hour, start_minute = _convert_time(start_time_value)
-    start_hour = _to_24hr(start_indicator_value, start_hour)
-    if stop_time_value is None:
+def _is_pm(indicator):
+    return indicator.ordinal == 1
+
+
+_NOON = (12, 0)
+_MIDNIGHT = (12, 0)
+
+
+def _get_time_range(start_time, start_is_pm, stop_time=None, stop_is_pm=False):
+    start_hour, start_minute = start_time
+    start_hour = _to_24hr(start_is_pm, start_hour)
+    if stop_time is None:
         return start_hour, start_minute, None, None
-    stop_hour, stop_minute = _convert_time(stop_time_value)
-    stop_hour = _to_24hr(stop_indicator_value, stop_hour)
+    stop_hour, stop_minute = stop_time
+    stop_hour = _to_24hr(stop_is_pm, stop_hour)
     return start_hour, start_minute, stop_hour, stop_minute
 
 
 def _start_time_only(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    start_indicator_value = values[1]
-    return _get_time_range(start_time_value, start_indicator_value)
+    return _get_time_range(tokens[0].time, _is_pm(tokens[1]))
 
 
 def _both_times_both_indicators(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    start_indicator_value = values[1]
-    stop_time_value = values[3]
-    stop_indicator_value = values[4]
     return _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value, stop_indicator_value
+        tokens[0].time, _is_pm(tokens[1]), tokens[3].time, _is_pm(tokens[4])
     )
 
 
 def _both_times_start_indicator(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    start_indicator_value = values[1]
-    stop_time_value = values[3]
-    stop_indicator_value = values[1]
-    return _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value, stop_indicator_value
-    )
+    start_is_pm = _is_pm(tokens[1])
+    return _get_time_range(tokens[0].time, start_is_pm, tokens[3].time, start_is_pm)
 
 
 def _both_times_stop_indicator(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    start_indicator_value = values[3]
-    stop_time_value = values[2]
-    stop_indicator_value = values[3]
-    return _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value, stop_indicator_value
-    )
+    stop_is_pm = _is_pm(tokens[3])
+    return _get_time_range(tokens[0].time, stop_is_pm, tokens[2].time, stop_is_pm)
 
 
 def _both_times_no_indicators(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    stop_time_value = values[2]
-    return _get_time_range(
-        start_time_value, "", stop_time_value, ""
-    )
+    return _get_time_range(tokens[0].time, False, tokens[2].time, False)
+
 
 def _start_time_noon(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = "12"
-    start_indicator_value = "pm"
-    stop_time_value = values[2]
-    stop_indicator_value = values[3]
-    return _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value, stop_indicator_value
-    )
+    return _get_time_range(_NOON, True, tokens[2].time, _is_pm(tokens[3]))
 
 
 def _stop_time_midnight(tokens):
-    values = [token[1] for token in tokens]
-    start_time_value = values[0]
-    start_indicator_value = values[1]
-    stop_time_value = "12"
-    stop_indicator_value = "am"
-    return _get_time_range(
-        start_time_value, start_indicator_value, stop_time_value, stop_indicator_value
-    )
+    return _get_time_range(tokens[0].time, _is_pm(tokens[1]), _MIDNIGHT, False)
+
+
+# Syntaxes supported for time ranges, with the handler that converts each to
+# start hour, start minute, stop hour, stop minute
+TIME_RANGE_SYNTAX = SyntaxTable((
+    ([Number, AmPm], _start_time_only),
+    ([Number, AmPm, Dash, Number, AmPm], _both_times_both_indicators),
+    ([Number, AmPm, Dash, Number], _both_times_start_indicator),
+    ([Number, Dash, Number, AmPm], _both_times_stop_indicator),
+    ([Number, AmPm, Dash, Midnight], _stop_time_midnight),
+    ([Noon, Dash, Number, AmPm], _start_time_noon),
+    ([Number, Dash, Number], _both_times_no_indicators),
+), name='time_range')
 
 
 def _get_start_stop_hour_minute(parsed, time_range):
-    return evaluate_by_syntax(
-        time_range,
-        parsed, (
-            ([Number, AmPm], _start_time_only),
-            ([Number, AmPm, Dash, Number, AmPm], _both_times_both_indicators),
-            ([Number, AmPm, Dash, Number], _both_times_start_indicator),
-            ([Number, Dash, Number, AmPm], _both_times_stop_indicator),
-            ([Number, AmPm, Dash, Midnight], _stop_time_midnight),
-            ([Noon, Dash, Number, AmPm], _start_time_noon),
-            ([Number, Dash, Number], _both_times_no_indicators),
-        )
-    )
+    return evaluate_by_syntax(time_range, parsed, TIME_RANGE_SYNTAX)
 
 
-def parse_time_range(on_date, time_range, local_tz=None):
+def parse_time_range(on_date, time_range, local_tz=None, context=None):
     """
     This function parses a text string describing a single time range,
     returning a tuple of start and end times (datetime.datetime) for the date
@@ -258,13 +308,22 @@ def parse_time_range(on_date, time_range, local_tz=None):
 
     :param on_date: datetime.date indicating the applicable date
     :param time_range: string representing the time range
-    :param local_tz: optional pytz time zone, for building localized times
+    :param local_tz: optional pytz or zoneinfo time zone, for building localized
+        times
+    :param context: optional ParseContext, which provides local_tz
     :return: datetime for start time, None or datetime for stop time
     """
+    if context is not None:
+        _check_context(context, local_tz)
+        return context.parse_time_range(on_date, time_range)
+    return _time_range_on_date(
+        on_date, time_range, _get_template(_time_range_template, time_range), local_tz
+    )
+
+
+def _time_range_on_date(on_date, time_range, hours_and_minutes, local_tz):
     year, month, day = on_date.year, on_date.month, on_date.day
-    parsed = parse(time_range)
-    start_hour, start_minute, stop_hour, stop_minute = \
-        _get_start_stop_hour_minute(parsed, time_range)
+    start_hour, start_minute, stop_hour, stop_minute = hours_and_minutes
     try:
         start_time = datetime(year, month, day, start_hour, start_minute)
     except ValueError as ex:
@@ -272,12 +331,12 @@ def parse_time_range(on_date, time_range, local_tz=None):
             time_range, ex
         )) from ex
     if local_tz:
-        start_time = local_tz.localize(start_time)
+        start_time = _localize(start_time, local_tz)
 
     if stop_hour is not None:
         stop_time = datetime(year, month, day, stop_hour, stop_minute)
         if local_tz:
-            stop_time = local_tz.localize(stop_time)
+            stop_time = _localize(stop_time, local_tz)
         if stop_time < start_time:
             stop_time += timedelta(days=1)
     else:
@@ -286,16 +345,89 @@ def parse_time_range(on_date, time_range, local_tz=None):
     return start_time, stop_time
 
 
-class _DaysRepeatPerWeekOfMonth(object):
+def _time_range_template(time_range):
+    return _get_start_stop_hour_minute(parse(time_range), time_range)
+
+
+def _get_date_window(how_long, local_tz, now):
     """
-    Generate repeated days, where the basis of the repetition is a certain week
-    of the month (e.g., first and third Fridays).
+    Find the dates covered by how_long from now, as a half-open range.  A date
+    is covered if the same time of day on that date is before now + how_long.
+    """
+    start = _get_now(local_tz, now).date()
+    one_day = timedelta(days=1)
+    if how_long <= timedelta(0):
+        return start, start
+    return start, start + one_day * -(-how_long // one_day)
+
+
+class _RepeatRule(object):
     """
+    Base class for compiled repeat phrases.  Rules are immutable and can be
+    pickled; the time range is resolved to hours and minutes when the rule is
+    created, so generating occurrences doesn't parse any strings.
+    """
+
+    __slots__ = ('day_of_week', 'time_range', 'hours_and_minutes')
+
+    def __init__(self, day_of_week, time_range, hours_and_minutes=None):
+        if hours_and_minutes is None:
+            hours_and_minutes = _get_template(_time_range_template, time_range)
+        self._set('day_of_week', day_of_week)
+        self._set('time_range', time_range)
+        self._set('hours_and_minutes', hours_and_minutes)
+
+    def _set(self, name, value):
+        object.__setattr__(self, name, value)
 
-    def __init__(self, day_of_week, occurrences_of_day, time_range):
-        self.day_of_week = day_of_week[0].get_day_of_week(day_of_week[1])  # can be Day or Days
-        self.occurrences_of_day = [int(x) for _, x in occurrences_of_day]
-        self.time_range = time_range
+    def __setattr__(self, name, value):
+        raise AttributeError('%s is immutable' % self.__class__.__name__)
+
+    def _args(self):
+        raise NotImplementedError
+
+    def __reduce__(self):
+        # hours_and_minutes is included so that unpickling doesn't parse the
+        # time range again; _args() alone determines equality.
+        return self.__class__, self._args() + (self.hours_and_minutes,)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._args() == other._args()
+
+    def __hash__(self):
+        return hash((self.__class__, self._args()))
+
+    def __repr__(self):
+        return '%s%r' % (self.__class__.__name__, self._args())
+
+    def _params(self):
+        raise NotImplementedError
+
+    def to_bytes(self):
+        """
+        Encode the rule in a compact, versioned binary format, from which
+        rule_from_bytes() rebuilds it without parsing any strings.  Encoded
+        rules can be concatenated and read back with iter_rules_from_bytes().
+
+        :return: bytes
+        """
+        start_hour, start_minute, stop_hour, stop_minute = self.hours_and_minutes
+        if not _is_time_of_day(start_hour, start_minute) or \
+                stop_hour is not None and not _is_time_of_day(stop_hour, stop_minute):
+            raise ValueError('%r can\'t be encoded: its times aren\'t times of day' % self)
+        if stop_hour is None:
+            stop_hour = stop_minute = _NO_TIME
+        params = self._params()
+        time_range = self.time_range.encode('utf-8')
+        try:
+            return _RULE_HEADER.pack(
+                RULE_FORMAT_VERSION, self._KIND, self.day_of_week,
+                start_hour, start_minute, stop_hour, stop_minute, len(params), len(time_range)
+            ) + struct.pack('<%dH' % len(params), *params) + time_range
+        except struct.error as ex:
+            raise ValueError('%r can\'t be encoded: %s' % (self, ex)) from ex
 
     def get_occurrences(self, how_long, local_tz, now):
         """
@@ -306,113 +438,686 @@ class _DaysRepeatPerWeekOfMonth(object):
         :param now:
         :return:
         """
-        current = _get_now(local_tz, now)
-        last = current + how_long
-        while current < last:
-            if current.weekday() == self.day_of_week:
-                # Okay, it is the correct day of the week, but it might not be the right occurrence.
-                for occurrence in self.occurrences_of_day:
-                    max_dom = 7 * occurrence  # 3rd Monday can't be later than 21st
-                    min_dom = max_dom - 6  # or earlier than 15th
-                    if min_dom <= current.day <= max_dom:
-                        # It is happening today!
-                        yield current.month, current.day, current.year
+        return self.get_occurrences_between(*_get_date_window(how_long, local_tz, now))
+
+    def get_occurrences_between(self, start, until):
+        """
+        Generate the dates of the repetition within a range of dates.
+
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :return: iterable of month, day, year tuples
+        """
+        raise NotImplementedError
+
+    def occurrences(self, start, until, local_tz=None):
+        """
+        Generate the start and stop times of the occurrences within a range of
+        dates.
+
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times
+        :return: iterable of tuples of start datetime and stop datetime (or
+            None)
+        """
+        return self._occurrences(self.get_occurrences_between(start, until), local_tz)
+
+    def _occurrences(self, dates, local_tz):
+        for month, day, year in dates:
+            yield _time_range_on_date(
+                date(year, month, day), self.time_range, self.hours_and_minutes, local_tz
+            )
+
+    def between(self, start, end, local_tz=None):
+        """
+        Generate the start and stop times of the occurrences which start
+        within a range of times.
+
+        :param start: datetime at or after which occurrences start
+        :param end: datetime before which occurrences start
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; start and end must be localized if this is
+            provided
+        :return: iterable of tuples of start datetime and stop datetime (or
+            None)
+        """
+        return self._starting_between(
+            self.occurrences(start.date(), end.date() + timedelta(days=1), local_tz), start, end
+        )
+
+    @staticmethod
+    def _starting_between(occurrences, start, end):
+        for starts_at, stops_at in occurrences:
+            if start <= starts_at < end:
+                yield starts_at, stops_at
+
+    def _next_date(self, day, anchor):
+        """
+        Return the first date of the repetition on or after day, or None.
+        """
+        raise NotImplementedError
+
+    def _prev_date(self, day, anchor):
+        """
+        Return the last date of the repetition on or before day, or None.
+        """
+        raise NotImplementedError
+
+    def next_after(self, t, local_tz=None):
+        """
+        Find the first occurrence which starts after a time, without
+        generating the occurrences in between.
+
+        :param t: datetime after which the occurrence starts
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; t must be localized if this is provided
+        :return: tuple of start datetime and stop datetime (or None), or None
+            if the rule has no occurrences
+        """
+        return self._next_after(t, local_tz, t.date())
+
+    def prev_before(self, t, local_tz=None):
+        """
+        Find the last occurrence which starts before a time, without
+        generating the occurrences in between.
+
+        :param t: datetime before which the occurrence starts
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; t must be localized if this is provided
+        :return: tuple of start datetime and stop datetime (or None), or None
+            if the rule has no occurrences
+        """
+        return self._prev_before(t, local_tz, t.date())
+
+    def _next_after(self, t, local_tz, anchor):
+        # An occurrence on the date of t may have already started, in which
+        # case the next one is on a later date.
+        day = self._next_date(t.date(), anchor)
+        while day is not None:
+            starts_at, stops_at = _time_range_on_date(
+                day, self.time_range, self.hours_and_minutes, local_tz
+            )
+            if starts_at > t:
+                return starts_at, stops_at
+            day = self._next_date(day + timedelta(days=1), anchor)
+        return None
+
+    def _prev_before(self, t, local_tz, anchor):
+        day = self._prev_date(t.date(), anchor)
+        while day is not None:
+            starts_at, stops_at = _time_range_on_date(
+                day, self.time_range, self.hours_and_minutes, local_tz
+            )
+            if starts_at < t:
+                return starts_at, stops_at
+            day = self._prev_date(day - timedelta(days=1), anchor)
+        return None
+
+
+def _monthrange(year, month):
+    # Like calendar.monthrange(), which would be the only use of calendar
+    # outside of parsing.
+    first = date(year, month, 1)
+    if month == 12:
+        following = date(year + 1, 1, 1)
+    else:
+        following = date(year, month + 1, 1)
+    return first.weekday(), (following - first).days
+
+
+# Every day of the week occurs five times in some month of any year, so a
+# search for the next or previous month with an occurrence can stop after a
+# year.
+_MONTHS_TO_SEARCH = 13
+
+
+class _DaysRepeatPerWeekOfMonth(_RepeatRule):
+    """
+    Generate repeated days, where the basis of the repetition is a certain week
+    of the month (e.g., first and third Fridays).
+    """
+
+    __slots__ = ('occurrences_of_day', '_sorted_occurrences')
+    _KIND = 1
+
+    def __init__(self, day_of_week, occurrences_of_day, time_range, hours_and_minutes=None):
+        """
+        :param day_of_week: day number 0-6
+        :param occurrences_of_day: sequence of occurrences of the day within
+            the month (1 for 1st, etc.)
+        :param time_range: string representing the time range
+        :param hours_and_minutes: start hour, start minute, stop hour and stop
+            minute, if already determined from time_range
+        """
+        super().__init__(day_of_week, time_range, hours_and_minutes)
+        self._set('occurrences_of_day', tuple(occurrences_of_day))
+        # Sorted, so that each month's days are generated in order; an
+        # occurrence listed twice is generated twice.
+        self._set('_sorted_occurrences', tuple(sorted(
+            occurrence for occurrence in self.occurrences_of_day if occurrence >= 1
+        )))
+
+    def _args(self):
+        return self.day_of_week, self.occurrences_of_day, self.time_range
+
+    def _params(self):
+        return self.occurrences_of_day
 
-            current += timedelta(days=1)
+    @classmethod
+    def _from_params(cls, day_of_week, params, time_range, hours_and_minutes):
+        return cls(day_of_week, params, time_range, hours_and_minutes)
 
+    def get_occurrences_between(self, start, until):
+        """
+        Generate the dates of the repetition within a range of dates, by
+        computing the matching days of each month directly.
 
-class _DaysRepeatPerWeek(object):
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :return: iterable of month, day, year tuples
+        """
+        year, month = start.year, start.month
+        while (year, month) <= (until.year, until.month):
+            for day in self._days_of_month(year, month):
+                if start <= date(year, month, day) < until:
+                    yield month, day, year
+            if month == 12:
+                year, month = year + 1, 1
+            else:
+                month += 1
+
+    def _days_of_month(self, year, month):
+        """
+        Return the days of the repetition within a month, in order.
+        """
+        first_weekday, days_in_month = _monthrange(year, month)
+        # day of month of the first occurrence of the day of the week
+        first_day = 1 + (self.day_of_week - first_weekday) % 7
+        days = []
+        for occurrence in self._sorted_occurrences:
+            day = first_day + 7 * (occurrence - 1)
+            if day > days_in_month:
+                break
+            days.append(day)
+        return days
+
+    def _next_date(self, day, anchor):
+        year, month, first = day.year, day.month, day.day
+        for _ in range(_MONTHS_TO_SEARCH):
+            for day_of_month in self._days_of_month(year, month):
+                if day_of_month >= first:
+                    return date(year, month, day_of_month)
+            if month == 12:
+                year, month = year + 1, 1
+            else:
+                month += 1
+            first = 1
+        return None
+
+    def _prev_date(self, day, anchor):
+        year, month, last = day.year, day.month, day.day
+        for _ in range(_MONTHS_TO_SEARCH):
+            for day_of_month in reversed(self._days_of_month(year, month)):
+                if day_of_month <= last:
+                    return date(year, month, day_of_month)
+            if month == 1:
+                year, month = year - 1, 12
+            else:
+                month -= 1
+            last = 31
+        return None
+
+
+class _DaysRepeatPerWeek(_RepeatRule):
     """
     Generate repeated days, where the basis of the repetition is relative
     to weeks since the prior repetition (e.g., every other Monday).
     """
 
-    def __init__(self, day_of_week, days_between, time_range):
-        self.day_of_week = day_of_week[0].get_day_of_week(day_of_week[1])  # can be Day or Days
-        self.days_between = days_between
-        self.time_range = time_range
+    __slots__ = ('days_between',)
+    _KIND = 2
 
-    def get_occurrences(self, how_long, local_tz, now):
+    def __init__(self, day_of_week, days_between, time_range, hours_and_minutes=None):
         """
-        Generate datetimes representing the repetition
+        :param day_of_week: day number 0-6
+        :param days_between: number of days from one occurrence to the next
+        :param time_range: string representing the time range
+        :param hours_and_minutes: start hour, start minute, stop hour and stop
+            minute, if already determined from time_range
+        """
+        super().__init__(day_of_week, time_range, hours_and_minutes)
+        self._set('days_between', days_between)
 
-        :param how_long:
-        :param local_tz:
-        :param now:
-        :return:
+    def _args(self):
+        return self.day_of_week, self.days_between, self.time_range
+
+    def _params(self):
+        return (self.days_between,)
+
+    @classmethod
+    def _from_params(cls, day_of_week, params, time_range, hours_and_minutes):
+        if len(params) != 1:
+            raise ValueError('Expected 1 parameter for %s, found %d' % (
+                cls.__name__, len(params)
+            ))
+        return cls(day_of_week, params[0], time_range, hours_and_minutes)
+
+    def _first_ordinal(self, start):
         """
-        current = _get_now(local_tz, now)
-        last = current + how_long
+        Return the day ordinal of the first occurrence on or after start,
+        which anchors the repetition.
+        """
+        return start.toordinal() + (self.day_of_week - start.weekday()) % 7
 
-        while current < last:
-            if current.weekday() == self.day_of_week:
-                break
-            current += timedelta(days=1)
-        else:
-            return  # no occurrences
+    def _first_ordinal_from(self, start, anchor):
+        """
+        Return the day ordinal of the first occurrence on or after start, on
+        the cycle determined by anchor (or by start if anchor is None).
+        """
+        if anchor is None:
+            return self._first_ordinal(start)
+        return self._next_date(start, anchor).toordinal()
 
-        while current < last:
+    def get_occurrences_between(self, start, until, anchor=None):
+        """
+        Generate the dates of the repetition within a range of dates.  The
+        first occurrence is the first matching day of the week on or after
+        the anchor, which defaults to start.
+
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :param anchor: optional datetime.date on or after which the
+            repetition starts, which determines the weeks of the occurrences
+            (occurrences before the anchor are found by counting back from
+            it); pass the same anchor for consecutive ranges to keep them on
+            the same cycle
+        :return: iterable of month, day, year tuples
+        """
+        first = self._first_ordinal_from(start, anchor)
+        for ordinal in range(first, until.toordinal(), self.days_between):
+            current = date.fromordinal(ordinal)
             yield current.month, current.day, current.year
-            current += timedelta(days=self.days_between)
+
+    def occurrences(self, start, until, local_tz=None, anchor=None):
+        """
+        Generate the start and stop times of the occurrences within a range of
+        dates.
+
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times
+        :param anchor: optional datetime.date which determines the weeks of
+            the occurrences, as for get_occurrences_between(); defaults to
+            start
+        :return: iterable of tuples of start datetime and stop datetime (or
+            None)
+        """
+        return self._occurrences(self.get_occurrences_between(start, until, anchor), local_tz)
+
+    def between(self, start, end, local_tz=None, anchor=None):
+        """
+        Generate the start and stop times of the occurrences which start
+        within a range of times.
+
+        :param start: datetime at or after which occurrences start
+        :param end: datetime before which occurrences start
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; start and end must be localized if this is
+            provided
+        :param anchor: optional datetime.date which determines the weeks of
+            the occurrences, as for get_occurrences_between(); defaults to
+            the date of start
+        :return: iterable of tuples of start datetime and stop datetime (or
+            None)
+        """
+        return self._starting_between(
+            self.occurrences(start.date(), end.date() + timedelta(days=1), local_tz, anchor),
+            start, end
+        )
+
+    def count_occurrences(self, start, until, anchor=None):
+        """
+        Count the occurrences that get_occurrences_between() would generate,
+        without generating them.
+
+        :param start: first datetime.date of the range
+        :param until: datetime.date following the last date of the range
+        :param anchor: optional datetime.date which determines the weeks of
+            the occurrences, as for get_occurrences_between(); defaults to
+            start
+        :return: number of occurrences
+        """
+        days = until.toordinal() - self._first_ordinal_from(start, anchor)
+        if days <= 0:
+            return 0
+        return (days - 1) // self.days_between + 1
+
+    def nth_occurrence(self, n, start, anchor=None):
+        """
+        Find an occurrence by its position, without generating the
+        occurrences before it.
+
+        :param n: zero-based position of the occurrence
+        :param start: datetime.date on or after which the occurrences are
+            counted
+        :param anchor: optional datetime.date which determines the weeks of
+            the occurrences, as for get_occurrences_between(); defaults to
+            start
+        :return: month, day, year tuple
+        """
+        if n < 0:
+            raise ValueError('Occurrence number must not be negative')
+        current = date.fromordinal(
+            self._first_ordinal_from(start, anchor) + n * self.days_between
+        )
+        return current.month, current.day, current.year
+
+    def next_after(self, t, local_tz=None, anchor=None):
+        """
+        Find the first occurrence which starts after a time, without
+        generating the occurrences in between.
+
+        :param t: datetime after which the occurrence starts
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; t must be localized if this is provided
+        :param anchor: datetime.date on or after which the repetition starts,
+            as for get_occurrences_between(), which determines the weeks of
+            the occurrences; defaults to the date of t
+        :return: tuple of start datetime and stop datetime (or None)
+        """
+        return self._next_after(t, local_tz, anchor or t.date())
+
+    def prev_before(self, t, local_tz=None, anchor=None):
+        """
+        Find the last occurrence which starts before a time, without
+        generating the occurrences in between.
+
+        :param t: datetime before which the occurrence starts
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times; t must be localized if this is provided
+        :param anchor: datetime.date on or after which the repetition starts,
+            as for get_occurrences_between(), which determines the weeks of
+            the occurrences (occurrences before the anchor are found by
+            counting back from it); defaults to the date of t
+        :return: tuple of start datetime and stop datetime (or None)
+        """
+        return self._prev_before(t, local_tz, anchor or t.date())
+
+    def _next_date(self, day, anchor):
+        first = self._first_ordinal(anchor)
+        periods = -((first - day.toordinal()) // self.days_between)
+        return date.fromordinal(first + periods * self.days_between)
+
+    def _prev_date(self, day, anchor):
+        first = self._first_ordinal(anchor)
+        periods = (day.toordinal() - first) // self.days_between
+        return date.fromordinal(first + periods * self.days_between)
+
+
+# Binary encoding of compiled rules written by to_bytes(), little-endian:
+#   B   format version (RULE_FORMAT_VERSION)
+#   B   kind of rule (see _RULE_KINDS)
+#   B   day of the week, 0-6
+#   4B  start hour (0-23), start minute (0-59), stop hour and stop minute
+#       (both _NO_TIME if the rule has no stop time)
+#   B   number of parameters, n
+#   B   length of the UTF-8 encoded time range string, m
+#   nH  parameters: the occurrences of the day within the month, or the
+#       number of days from one occurrence to the next
+#   m   time range string
+RULE_FORMAT_VERSION = 1
+_RULE_HEADER = struct.Struct('<9B')
+_NO_TIME = 255  # outside the range of hours and minutes that can be encoded
+_RULE_KINDS = {
+    rule_class._KIND: rule_class  # pylint: disable=protected-access
+    for rule_class in (_DaysRepeatPerWeekOfMonth, _DaysRepeatPerWeek)
+}
+
+
+def _is_time_of_day(hour, minute):
+    return 0 <= hour <= 23 and 0 <= minute <= 59
+
+
+def _rule_at(data, offset, decoded=None):
+    """
+    Decode the rule encoded at an offset of a buffer, returning the rule and
+    the offset following it.  Rules are immutable, so if a dict of decoded
+    rules is provided, identical encodings share the same rule.
+    """
+    try:
+        (
+            version, kind, day_of_week, start_hour, start_minute, stop_hour, stop_minute,
+            count, length,
+        ) = _RULE_HEADER.unpack_from(data, offset)
+    except struct.error as ex:
+        raise ValueError('Truncated rule at offset %d' % offset) from ex
+    start = offset + _RULE_HEADER.size + 2 * count
+    end = start + length
+    if end > len(data):
+        raise ValueError('Truncated rule at offset %d' % offset)
+    if decoded is not None:
+        key = bytes(data[offset:end])
+        rule = decoded.get(key)
+        if rule is not None:
+            return rule, end
+    if version != RULE_FORMAT_VERSION:
+        raise ValueError('Unsupported rule format version %d at offset %d' % (version, offset))
+    rule_class = _RULE_KINDS.get(kind)
+    if rule_class is None or day_of_week > 6:
+        raise ValueError('Invalid rule at offset %d' % offset)
+    if stop_hour == stop_minute == _NO_TIME:
+        stop_hour = stop_minute = None
+    elif not _is_time_of_day(stop_hour, stop_minute):
+        raise ValueError('Invalid rule at offset %d' % offset)
+    if not _is_time_of_day(start_hour, start_minute):
+        raise ValueError('Invalid rule at offset %d' % offset)
+    rule = rule_class._from_params(  # pylint: disable=protected-access
+        day_of_week, struct.unpack_from('<%dH' % count, data, offset + _RULE_HEADER.size),
+        str(data[start:end], 'utf-8'), (start_hour, start_minute, stop_hour, stop_minute)
+    )
+    if decoded is not None:
+        decoded[key] = rule
+    return rule, end
+
+
+def rule_from_bytes(data):
+    """
+    Rebuild a compiled repeat rule from the bytes returned by its to_bytes()
+    method, without parsing the phrase again.
+
+    Example:
+
+    from e_time import compile_repeat_phrase, rule_from_bytes
+    data = compile_repeat_phrase('1st and 3rd Wednesdays 8:30pm').to_bytes()
+    rule = rule_from_bytes(data)
+
+    :param data: bytes or other buffer, such as a memoryview
+    :return: rule object, as returned by compile_repeat_phrase()
+    """
+    rule, end = _rule_at(data, 0)
+    if end != len(data):
+        raise ValueError('Unexpected data after the rule at offset %d' % end)
+    return rule
+
+
+def iter_rules_from_bytes(data):
+    """
+    Generate the compiled repeat rules from a buffer holding the results of
+    their to_bytes() methods, one after another.  The buffer can be a
+    memory-mapped file, e.g., to share rules among worker processes.
+
+    Example:
+
+    import mmap
+    from e_time import iter_rules_from_bytes
+    # written with output.write(b''.join(rule.to_bytes() for rule in rules))
+    with open('rules.bin', 'rb') as rules_file:
+        with mmap.mmap(rules_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            rules = list(iter_rules_from_bytes(data))
+
+    :param data: bytes or other buffer, such as a memoryview or mmap
+    :return: iterable of rule objects, as returned by compile_repeat_phrase()
+    """
+    decoded = {}
+    offset = 0
+    size = len(data)
+    while offset < size:
+        rule, offset = _rule_at(data, offset, decoded)
+        yield rule
+
+
+def _time_range_from_tokens(tokens):
+    time_range = ''.join(token.value for token in tokens)
+    return time_range, _get_start_stop_hour_minute(tokens, time_range)
+
+
+def _expect(token, is_expected, expected):
+    # A phrase with the right syntax but the wrong words is reported like any
+    # other phrase that can't be parsed, so that bulk parsing can record it.
+    if not is_expected:
+        raise ParseError('Expected %s, found "%s"' % (expected, token.value), token.span)
+
+
+def _expect_suffix(token):
+    _expect(token, len(token.value) == 2, 'a suffix like "st"')  # 'st', 'nd', 'rd', etc.
 
 
 def _repeat_phrase_1(tokens):
-    values = [token[1] for token in tokens]
-    assert len(values[1]) == len(values[6]) == 2  # 'st', 'nd', 'rd', etc.
-    assert values[3] == 'and'
+    _expect_suffix(tokens[1])
+    _expect_suffix(tokens[6])
+    _expect(tokens[3], tokens[3].value == 'and', '"and"')
     repeat = _DaysRepeatPerWeekOfMonth(
-        tokens[8],
-        [tokens[0], tokens[5]],
-        values[10] + values[11],
+        tokens[8].ordinal,
+        [tokens[0].number, tokens[5].number],
+        *_time_range_from_tokens(tokens[10:])
     )
     return repeat
 
 
 def _repeat_phrase_2(tokens):
-    values = [token[1] for token in tokens]
-    assert len(values[1]) == 2  # 'st', 'nd', 'rd', etc.
+    _expect_suffix(tokens[1])
     repeat = _DaysRepeatPerWeekOfMonth(
-        tokens[3],
-        [tokens[0]],
-        values[5] + values[6] + values[7] + values[8] + values[9],
+        tokens[3].ordinal,
+        [tokens[0].number],
+        *_time_range_from_tokens(tokens[5:])
     )
     return repeat
 
 
 def _repeat_phrase_3(tokens):
-    values = [token[1] for token in tokens]
-    assert values[0].lower() == 'every'
-    assert values[2].lower() == 'other'
+    _expect(tokens[0], tokens[0].value.lower() == 'every', '"every"')
+    _expect(tokens[2], tokens[2].value.lower() == 'other', '"other"')
     repeat = _DaysRepeatPerWeek(
-        tokens[4],
+        tokens[4].ordinal,
         14,  # "every other" === "every 14 days",
-        values[6] + values[7] + values[8] + values[9]
+        *_time_range_from_tokens(tokens[6:])
     )
     return repeat
 
 
 def _repeat_phrase_4(tokens):
-    values = [token[1] for token in tokens]
     repeat = _DaysRepeatPerWeek(
-        tokens[0],
+        tokens[0].ordinal,
         7,  # every === "every 7 days",
-        ''.join(values[2:]),
+        *_time_range_from_tokens(tokens[2:])
     )
     return repeat
 
 
 def _repeat_phrase_5(tokens):
-    values = [token[1] for token in tokens]
-    assert len(values[1]) == 2  # 'st', 'nd', 'rd', etc.
+    _expect_suffix(tokens[1])
     repeat = _DaysRepeatPerWeekOfMonth(
-        tokens[3],
-        [tokens[0]],
-        values[5] + values[6] + values[7],
+        tokens[3].ordinal,
+        [tokens[0].number],
+        *_time_range_from_tokens(tokens[5:])
     )
     return repeat
 
 
-def parse_repeat_phrase(phrase, how_long, local_tz=None, now=None):
+# Syntaxes supported by parse_repeat_phrase() (whitespace tokens included),
+# with the handler that builds the repetition for each
+REPEAT_PHRASE_SYNTAX = SyntaxTable((
+    # '1st and 3rd Wednesdays 8:30pm'
+    (
+        [
+            Number, String, Whitespace, String, Whitespace, Number,
+            String, Whitespace, Days, Whitespace, Number, AmPm
+        ],
+        _repeat_phrase_1,
+    ),
+    # '1st Fridays 8:30pm-12:30am'
+    (
+        [
+            Number, String, Whitespace, Days, Whitespace,
+            Number, AmPm, Dash, Number, AmPm,
+        ],
+        _repeat_phrase_2,
+    ),
+    # 'Every other Thursday 8-11pm'
+    (
+        [
+            String, Whitespace, String, Whitespace, Day, Whitespace,
+            Number, Dash, Number, AmPm
+        ],
+        _repeat_phrase_3,
+    ),
+    # 'Thursdays 8pm-12am'
+    (
+        [
+            Days, Whitespace,
+            Number, AmPm, Dash, Number, AmPm,
+        ],
+        _repeat_phrase_4,
+    ),
+    # '1st Fridays 20:30-23:30'
+    (
+        [
+            Number, String, Whitespace, Days, Whitespace,
+            Number, Dash, Number,
+        ],
+        _repeat_phrase_5,
+    ),
+), name='repeat_phrase')
+
+
+def _repeat_phrase_template(phrase):
+    parsed = parse(phrase, ignore_whitespace=False)
+    return evaluate_by_syntax(phrase, parsed, REPEAT_PHRASE_SYNTAX)
+
+
+def compile_repeat_phrase(phrase, context=None):
+    """
+    This function parses a text string describing occurrences of an event
+    that repeats on some or all of a specific day of the week, returning a
+    rule object which can generate the occurrences any number of times
+    without parsing the string again.  Rule objects are immutable and can be
+    pickled.
+
+    Example:
+
+    from datetime import date
+    import pytz
+    from e_time import compile_repeat_phrase
+    us_eastern = pytz.timezone('US/Eastern')
+    rule = compile_repeat_phrase('1st and 3rd Wednesdays 8:30pm')
+    for starts_at, ends_at in rule.occurrences(date(2018, 1, 1), date(2019, 1, 1), us_eastern):
+        print(starts_at)
+
+    :param phrase: "1st and 3rd Wednesdays 8:30pm", etc.
+    :param context: optional ParseContext, whose cache of parsed strings is
+        used
+    :return: rule object with methods occurrences(start, until, local_tz) for a
+        range of dates and between(start, end, local_tz) for a range of times
+    """
+    if context is not None:
+        return context.compile_repeat_phrase(phrase)
+    return _get_template(_repeat_phrase_template, phrase)
+
+
+def parse_repeat_phrase(phrase, how_long, local_tz=None, now=None, context=None):
     """
     :param phrase: "1st and 3rd Wednesdays 8:30pm", etc.
     :param how_long: (timedelta) For how long into the future should
@@ -421,57 +1126,186 @@ def parse_repeat_phrase(phrase, how_long, local_tz=None, now=None):
         will be returned)
     :param now: Optional current time (if not provided, the current time will
         be used)
+    :param context: optional ParseContext, which provides local_tz and now
     :return: iterable of tuples of begin/end datetime covering all occurrences
         between now and now + how_long
     """
-    parsed = parse(phrase, ignore_whitespace=False)
-    repeat = evaluate_by_syntax(
-        phrase,
-        parsed, (
-            # '1st and 3rd Wednesdays 8:30pm'
-            (
-                [
-                    Number, String, Whitespace, String, Whitespace, Number,
-                    String, Whitespace, Days, Whitespace, Number, AmPm
-                ],
-                _repeat_phrase_1,
-            ),
-            # '1st Fridays 8:30pm-12:30am'
-            (
-                [
-                    Number, String, Whitespace, Days, Whitespace,
-                    Number, AmPm, Dash, Number, AmPm,
-                ],
-                _repeat_phrase_2,
-            ),
-            # 'Every other Thursday 8-11pm'
-            (
-                [
-                    String, Whitespace, String, Whitespace, Day, Whitespace,
-                    Number, Dash, Number, AmPm
-                ],
-                _repeat_phrase_3,
-            ),
-            # 'Thursdays 8pm-12am'
-            (
-                [
-                    Days, Whitespace,
-                    Number, AmPm, Dash, Number, AmPm,
-                ],
-                _repeat_phrase_4,
-            ),
-            # '1st Fridays 20:30-23:30'
-            (
-                [
-                    Number, String, Whitespace, Days, Whitespace,
-                    Number, Dash, Number,
-                ],
-                _repeat_phrase_5,
-            ),
-        ),
-    )
+    if context is not None:
+        _check_context(context, local_tz, now)
+        yield from context.parse_repeat_phrase(phrase, how_long)
+        return
+    repeat = compile_repeat_phrase(phrase)
+    yield from repeat.occurrences(*_get_date_window(how_long, local_tz, now), local_tz=local_tz)
+
+
+def next_occurrence_after(phrase, t, local_tz=None, context=None):
+    """
+    Find the first occurrence of a repeat phrase which starts after a time,
+    in constant time rather than by generating the occurrences.  For phrases
+    like "Every other Thursday", the repetition starts on the date of t, as
+    for parse_repeat_phrase() with now=t.
+
+    Example:
+
+    from datetime import datetime
+    import pytz
+    from e_time import next_occurrence_after
+    us_eastern = pytz.timezone('US/Eastern')
+    now = us_eastern.localize(datetime(2018, 1, 15, 12))
+    starts_at, ends_at = next_occurrence_after('1st and 3rd Wednesdays 8:30pm', now, us_eastern)
+
+    :param phrase: "1st and 3rd Wednesdays 8:30pm", etc.
+    :param t: datetime after which the occurrence starts
+    :param local_tz: optional pytz or zoneinfo time zone, for building
+        localized times; t must be localized if this is provided
+    :param context: optional ParseContext, which provides local_tz
+    :return: tuple of start datetime and stop datetime (or None), or None if
+        the phrase has no occurrences
+    """
+    if context is not None:
+        _check_context(context, local_tz)
+        return context.compile_repeat_phrase(phrase).next_after(t, context.local_tz)
+    return compile_repeat_phrase(phrase).next_after(t, local_tz)
+
+
+def prev_occurrence_before(phrase, t, local_tz=None, context=None):
+    """
+    Find the last occurrence of a repeat phrase which starts before a time,
+    in constant time rather than by generating the occurrences.  For phrases
+    like "Every other Thursday", the repetition is counted back from the date
+    of t, consistently with next_occurrence_after().
+
+    :param phrase: "1st and 3rd Wednesdays 8:30pm", etc.
+    :param t: datetime before which the occurrence starts
+    :param local_tz: optional pytz or zoneinfo time zone, for building
+        localized times; t must be localized if this is provided
+    :param context: optional ParseContext, which provides local_tz
+    :return: tuple of start datetime and stop datetime (or None), or None if
+        the phrase has no occurrences
+    """
+    if context is not None:
+        _check_context(context, local_tz)
+        return context.compile_repeat_phrase(phrase).prev_before(t, context.local_tz)
+    return compile_repeat_phrase(phrase).prev_before(t, local_tz)
 
-    for month, day, year in repeat.get_occurrences(how_long, local_tz, now):
-        yield parse_time_range(
-            date(year, month, day), repeat.time_range, local_tz,
+
+class ParseContext(object):
+    """
+    The time zone and current time for many calls to the API functions,
+    resolved once, along with caches which are only valid for them.  Passing
+    a context to the API functions as context= (or calling the same methods
+    of the context) avoids reading the clock and localizing the current time
+    on every call, and makes the results of a batch job consistent even if it
+    runs across midnight or the new year.
+
+    - A pytz time zone is wrapped in a CachedTimeZone, so that the UTC offset
+      of each local date is looked up once.
+    - The year guessed for each month and day is remembered.
+    - Parsed strings are kept in the shared cache (see cache_info()), or in a
+      cache belonging to the context if cache_size is provided.
+
+    Contexts can be pickled, e.g., to be sent to worker processes; the
+    caches are not included.
+
+    Example:
+
+    import pytz
+    from e_time import ParseContext, parse_single_event
+    context = ParseContext(pytz.timezone('US/Eastern'))
+    for line in lines:
+        starts_at, ends_at = parse_single_event(line, context=context)
+    """
+
+    def __init__(self, local_tz=None, now=None, cache_size=None, cache_offsets=True):
+        """
+        :param local_tz: optional pytz or zoneinfo time zone, for building
+            localized times
+        :param now: optional current time; if not provided, the current time
+            is read once, when the context is created
+        :param cache_size: optional maximum number of parsed strings to keep
+            in a cache belonging to the context, instead of the shared cache
+        :param cache_offsets: whether to wrap a pytz time zone in a
+            CachedTimeZone
+        """
+        self._init_args = local_tz, now, cache_size, cache_offsets
+        if cache_offsets and hasattr(local_tz, 'localize') and \
+                not isinstance(local_tz, CachedTimeZone):
+            local_tz = CachedTimeZone(local_tz)
+        self.local_tz = local_tz
+        self.now = _get_now(local_tz, now)
+        self._years = {}
+        if cache_size is None:
+            self._cache = None
+        else:
+            self._cache = lru_cache(maxsize=cache_size)(_build_template)
+            _context_caches.add(self)
+
+    def __reduce__(self):
+        local_tz, now, cache_size, cache_offsets = self._init_args
+        return self.__class__, (local_tz, self.now if now is None else now, cache_size,
+                                cache_offsets)
+
+    def __repr__(self):
+        return 'ParseContext(%r, %r)' % (self.local_tz, self.now)
+
+    def _get_template(self, builder, string):
+        if self._cache is None:
+            return _get_template(builder, string)
+        return self._cache(builder, string)
+
+    def cache_info(self):
+        """
+        Report statistics for the cache of parsed strings used by the context.
+
+        :return: functools-style CacheInfo named tuple
+        """
+        if self._cache is None:
+            return cache_info()
+        return self._cache.cache_info()
+
+    def _guess_year(self, month, day):
+        year = self._years.get((month, day))
+        if year is None:
+            year = _guess_year(month, day, self.local_tz, self.now)
+            self._years[(month, day)] = year
+        return year
+
+    def guess_date(self, month, day):
+        """
+        Like guess_date(), using the context's time zone and current time.
+        """
+        return date(self._guess_year(month, day), month, day)
+
+    def parse_single_event(self, when):
+        """
+        Like parse_single_event(), using the context's time zone and current
+        time.
+        """
+        month, day, year, times = self._get_template(_single_event_template, when)
+        if year is None:
+            year = self._guess_year(month, day)
+        return _single_event_times(month, day, year, times, self.local_tz)
+
+    def parse_time_range(self, on_date, time_range):
+        """
+        Like parse_time_range(), using the context's time zone.
+        """
+        return _time_range_on_date(
+            on_date, time_range, self._get_template(_time_range_template, time_range),
+            self.local_tz
+        )
+
+    def compile_repeat_phrase(self, phrase):
+        """
+        Like compile_repeat_phrase(), using the context's cache.
+        """
+        return self._get_template(_repeat_phrase_template, phrase)
+
+    def parse_repeat_phrase(self, phrase, how_long):
+        """
+        Like parse_repeat_phrase(), using the context's time zone and current
+        time.
+        """
+        return self.compile_repeat_phrase(phrase).occurrences(
+            *_get_date_window(how_long, self.local_tz, self.now), local_tz=self.local_tz
         )
@@ -1,6 +1,29 @@
 """ Logic to split time strings into tokens and determine token types """
-import calendar
-import re
+from _thread import allocate_lock
+import sys
+from types import MappingProxyType
+
+# The calendar and re modules, and the tables built with them, are only
+# loaded when the first string is parsed, to keep the import of e_time cheap
+# for programs that may not parse anything.
+# pylint: disable=import-outside-toplevel
+
+
+class _CalendarNames(object):
+    """
+    Class attribute holding a list built from the calendar module's
+    localized names the first time it is used.
+    """
+
+    def __init__(self, build):
+        self._build = build
+        self._names = None
+
+    def __get__(self, instance, owner):
+        if self._names is None:
+            import calendar
+            self._names = self._build(calendar)
+        return self._names
 
 
 class IgnoreCase(object):
@@ -25,7 +48,7 @@ class BaseToken(object):
     Base class for the various token types that can appear in supported
     date/time phrases
     """
-    subclasses = []
+    subclasses = ()
 
     @classmethod
     def prep_val(cls, val):
@@ -43,7 +66,7 @@ class Comma(BaseToken):
     """
     Match and represent a common in the date/time phrase
     """
-    subclasses = []
+    subclasses = ()
     pat = r'^,$'
 
 
@@ -51,7 +74,7 @@ class Whitespace(BaseToken):
     """
     Match and represent whitespace in the date/time phrase
     """
-    subclasses = []
+    subclasses = ()
     pat = r'^[ \t\u00A0]+$'
 
 
@@ -59,7 +82,7 @@ class String(BaseToken):
     """
     Match and represent an arbitrary non-numeric string in the date/time phrase
     """
-    subclasses = []
+    subclasses = ()
     pat = r'^[A-Za-z.]+$'
     values = []
 
@@ -74,13 +97,27 @@ class String(BaseToken):
         """
         return cls.prep_val(val) in cls.values
 
+    @classmethod
+    def keywords(cls):
+        """
+        Generate the entries this class contributes to the keyword lookup
+        table.
+
+        :return: iterable of (value, canonical value, ordinal) tuples, where
+            value is in the form returned by prep_val()
+        """
+        for value in cls.values:
+            yield value, value, None
+
 
 class Month(IgnoreCase, String):
     """
     Represent a month string
     """
-    values = [m.lower() for m in calendar.month_name if m != ''] + \
-             [m.lower() for m in calendar.month_abbr if m != '']
+    values = _CalendarNames(lambda calendar: (
+        [m.lower() for m in calendar.month_name if m != ''] +
+        [m.lower() for m in calendar.month_abbr if m != '']
+    ))
 
     @classmethod
     def get_month_number(cls, val):
@@ -90,20 +127,25 @@ class Month(IgnoreCase, String):
         :param val: the month string
         :return: month number 1-12
         """
-        orig_val = val
-        val = val.lower()
-        for month_iterable in (calendar.month_abbr, calendar.month_name):
+        entry = _get_keywords().get(val.lower())
+        if entry is None or entry[0] is not cls:
+            raise ValueError('Invalid month "%s"' % val)
+        return entry[2]
+
+    @classmethod
+    def keywords(cls):
+        import calendar
+        for month_iterable in (calendar.month_name, calendar.month_abbr):
             for month_num, month_str in enumerate(month_iterable):
-                if month_str.lower() == val:
-                    return month_num
-        raise ValueError('Invalid month "%s"' % orig_val)
+                if month_str != '':
+                    yield month_str.lower(), calendar.month_name[month_num], month_num
 
 
 class Day(String):
     """
     Represent the singular form of a day of the week (string)
     """
-    values = list(calendar.day_name)
+    values = _CalendarNames(lambda calendar: list(calendar.day_name))
 
     @classmethod
     def get_day_of_week(cls, value):
@@ -113,17 +155,25 @@ class Day(String):
         :param value: the day string
         :return: day number 0-6
         """
-        return cls.values.index(value)
+        entry = _get_keywords().get(value)
+        if entry is None or entry[0] is not cls:
+            raise ValueError('Invalid day "%s"' % value)
+        return entry[2]
+
+    @classmethod
+    def keywords(cls):
+        for day_num, value in enumerate(cls.values):
+            yield value, value, day_num
 
 
 class Days(String):
     """
     Represent the plural form of a day of the week (string)
     """
-    values = [
+    values = _CalendarNames(lambda calendar: [
         '%ss' % day_name
         for day_name in calendar.day_name
-    ]
+    ])
 
     @classmethod
     def get_day_of_week(cls, value):
@@ -133,7 +183,15 @@ class Days(String):
         :param value: the day string
         :return: day number 0-6
         """
-        return Day.get_day_of_week(value[:-1])
+        entry = _get_keywords().get(value)
+        if entry is None or entry[0] is not cls:
+            raise ValueError('Invalid day "%s"' % value)
+        return entry[2]
+
+    @classmethod
+    def keywords(cls):
+        for day_num, value in enumerate(cls.values):
+            yield value, value, day_num
 
 
 class AmPm(IgnoreCase, String):
@@ -152,7 +210,15 @@ class AmPm(IgnoreCase, String):
         :param val: the AM/PM string
         :return: True if it represents PM
         """
-        return val.lower() in cls.pm_values
+        entry = _get_keywords().get(val.lower())
+        return entry is not None and entry[0] is cls and entry[2] == 1
+
+    @classmethod
+    def keywords(cls):
+        for value in cls.am_values:
+            yield value, 'am', 0
+        for value in cls.pm_values:
+            yield value, 'pm', 1
 
 
 class Midnight(IgnoreCase, String):
@@ -169,19 +235,85 @@ class Noon(IgnoreCase, String):
     values = ["noon"]
 
 
-String.subclasses.append(Days)
-String.subclasses.append(Day)
-String.subclasses.append(AmPm)
-String.subclasses.append(Month)
-String.subclasses.append(Midnight)
-String.subclasses.append(Noon)
+# String subclasses in order of precedence; see register_string_class()
+String.subclasses = (Days, Day, AmPm, Month, Midnight, Noon)
+
+
+def _build_keyword_table(string_classes):
+    """
+    Build the lookup table used to classify String tokens.  Classes earlier
+    in string_classes take precedence when they claim the same value.
+    IgnoreCase classes are keyed by the lower-case value and case-sensitive
+    classes by the value as-is, so a case-sensitive value which an earlier
+    IgnoreCase class matches in any case is left out.
+
+    :param string_classes: String subclasses, in order of precedence
+    :return: read-only mapping of prepared value to a tuple of
+        (token class, canonical value, ordinal)
+    """
+    table = {}
+    for string_class in string_classes:
+        ignore_case = issubclass(string_class, IgnoreCase)
+        for value, canonical_value, ordinal in string_class.keywords():
+            if value in table:
+                continue
+            if not ignore_case:
+                entry = table.get(value.lower())
+                if entry is not None and issubclass(entry[0], IgnoreCase):
+                    continue
+            table[value] = (string_class, canonical_value, ordinal)
+    return MappingProxyType(table)
+
+
+# Built by _get_keywords() when first needed.  Registration replaces
+# String.subclasses and _KEYWORDS with new immutable objects rather than
+# changing them, so readers never need the lock; they see either the old or
+# the new table.
+_KEYWORDS = None
+_REGISTRY_LOCK = allocate_lock()
+
+
+def _get_keywords():
+    global _KEYWORDS  # pylint: disable=global-statement
+    keywords = _KEYWORDS
+    if keywords is None:
+        with _REGISTRY_LOCK:
+            if _KEYWORDS is None:
+                _KEYWORDS = _build_keyword_table(String.subclasses)
+            keywords = _KEYWORDS
+    return keywords
+
+
+def register_string_class(string_class):
+    """
+    Add a String subclass to those used to classify String tokens, with
+    lower precedence than the classes already registered.  This is safe to
+    call while other threads are parsing.  Parsed strings are removed from
+    the shared cache and the caches of ParseContext objects, as their words
+    may now be classified differently.
+
+    :param string_class: String subclass whose keywords() yields the values
+        it represents
+    :raises ValueError: if the class is already registered
+    """
+    global _KEYWORDS  # pylint: disable=global-statement
+    with _REGISTRY_LOCK:
+        if string_class in String.subclasses:
+            raise ValueError('%s is already registered' % string_class.__name__)
+        subclasses = String.subclasses + (string_class,)
+        _KEYWORDS = _build_keyword_table(subclasses)
+        String.subclasses = subclasses
+        # If the parser hasn't been imported, nothing has been cached.
+        parser = sys.modules.get(__name__.rpartition('.')[0] + '.parser')
+        if parser is not None:
+            parser._clear_all_caches()  # pylint: disable=protected-access
 
 
 class Number(BaseToken):
     """
     Represent a number from datetime strings, including a time like "9:00"
     """
-    subclasses = []
+    subclasses = ()
     pat = r'^[0-9:]+$'
 
 
@@ -189,46 +321,193 @@ class Dash(BaseToken):
     """
     Represent dash/hyphen/etc.
     """
-    subclasses = []
+    subclasses = ()
     pat = r'^[-–—]+$'
 
 
-TYPES = [Comma, Whitespace, String, Number, Dash]
+TYPES = (Comma, Whitespace, String, Number, Dash)
 
 
-def _find_type(val):
-    for token_type in TYPES:
-        if re.match(token_type.pat, val):
-            return token_type
-    raise ValueError('bad token: "%s"' % val)
+class ParseError(ValueError):
+    """
+    Raised when a string can't be parsed.  When the part of the string that
+    could not be parsed is known, span has its start and end offsets.
+    """
+
+    def __init__(self, message, span=None):
+        if span is not None:
+            message = '%s at position %d' % (message, span[0])
+        super().__init__(message)
+        self.span = span
+
+
+_TOKEN_TYPES_BY_NAME = {token_type.__name__: token_type for token_type in TYPES}
+_LEXER = None
+
+
+def _get_lexer():
+    # All token patterns combined into one regex, compiled on first use, so
+    # that a phrase is split into tokens in a single pass.  Each pattern is
+    # anchored with "$" in its class, which also accepts a single trailing
+    # newline; "\n?" preserves that behavior here.  Any other character is
+    # reported as a bad token.  Compiling twice in a race is harmless.
+    global _LEXER  # pylint: disable=global-statement
+    lexer = _LEXER
+    if lexer is None:
+        import re
+        lexer = _LEXER = re.compile(
+            '|'.join(
+                '(?P<%s>%s\n?)' % (token_type.__name__, token_type.pat[1:-1])
+                for token_type in TYPES
+            ) + '|(?P<_bad>.)',
+            re.DOTALL
+        )
+    return lexer
 
 
 def _get_token(string):
-    chars = iter(string)
-    token_type, token_value = None, ''
-    while True:
-        try:
-            next_char = next(chars)
-        except StopIteration:
-            yield token_type, token_value
-            break
-        if token_type and re.match(token_type.pat, token_value + next_char):
-            token_value += next_char
-            continue
-        if token_value != '':
-            yield token_type, token_value
-        token_value = next_char
-        token_type = _find_type(token_value)
+    # Only offsets are produced here; substrings are created by callers that
+    # need the values.
+    for match in _get_lexer().finditer(string):
+        token_type = _TOKEN_TYPES_BY_NAME.get(match.lastgroup)
+        if token_type is None:
+            raise ParseError('bad token: "%s"' % match.group(), match.span())
+        yield token_type, match.start(), match.end()
+
+
+def _lookup_keyword(value):
+    # Case-sensitive classes are keyed by the value as-is and IgnoreCase
+    # classes by the lower-case form.  The table leaves out case-sensitive
+    # values which an IgnoreCase class with higher precedence matches, so
+    # probing the value as-is first preserves the precedence order.
+    keywords = _get_keywords()  # the same table for both probes
+    entry = keywords.get(value)
+    if entry is not None:
+        return entry
+    entry = keywords.get(value.lower())
+    if entry is not None and issubclass(entry[0], IgnoreCase):
+        return entry
+    return None
 
 
 def _get_most_specific(token_type, token_value):
+    """
+    Return the most specific token type for a value, along with the ordinal
+    from the keyword table (or None).
+    """
+    if token_type is String:
+        entry = _lookup_keyword(token_value)
+        if entry is not None:
+            return entry[0], entry[2]
+        return token_type, None
     for subclass in token_type.subclasses:
         if subclass.is_it(token_value):
-            return subclass, token_value
-    return token_type, token_value
+            return subclass, None
+    return token_type, None
+
+
+_NOT_CONVERTED = object()
+
+
+class Token(object):
+    """
+    A token from a date/time phrase, with its type, its value, its position in
+    the phrase, and numeric forms of the value that are computed at most once.
+    For backwards compatibility, a token also behaves like a tuple of type and
+    value.
+    """
+
+    __slots__ = (
+        'type', '_value', '_source', 'start', 'end', 'ordinal', '_number', '_time',
+    )
+
+    def __init__(self, token_type, value, start, end, ordinal=None, source=None):
+        """
+        :param token_type: token class, such as Number or Month
+        :param value: the token string, or None to take it from source when
+            it is first needed
+        :param start: offset of the token in the phrase
+        :param end: offset following the token in the phrase
+        :param ordinal: month number for Month, day number 0-6 for Day and
+            Days, 0 (AM) or 1 (PM) for AmPm, otherwise None
+        :param source: the phrase, required if value is None
+        """
+        self.type = token_type
+        self._value = value
+        self._source = source
+        self.start = start
+        self.end = end
+        self.ordinal = ordinal
+        self._number = _NOT_CONVERTED
+        self._time = _NOT_CONVERTED
+
+    @property
+    def value(self):
+        """
+        The token string
+        """
+        if self._value is None:
+            self._value = self._source[self.start:self.end]
+        return self._value
+
+    @property
+    def span(self):
+        """
+        The start and end offsets of the token in the phrase
+        """
+        return self.start, self.end
 
+    @property
+    def number(self):
+        """
+        The value of a Number token as an integer (e.g., a day or year)
 
-def parse(time, ignore_whitespace=True):
+        :raises ValueError: if the value is not an integer
+        """
+        if self._number is _NOT_CONVERTED:
+            self._number = int(self.value)
+        return self._number
+
+    @property
+    def time(self):
+        """
+        The value of a Number token as a tuple of hour and minute (e.g., from
+        "9" or "9:30")
+
+        :raises ValueError: if the value is not a time
+        """
+        if self._time is _NOT_CONVERTED:
+            values = list(map(int, self.value.split(':')))
+            self._time = (values[0], values[1] if len(values) > 1 else 0)
+        return self._time
+
+    def _as_tuple(self):
+        return self.type, self.value
+
+    def __getitem__(self, index):
+        return self._as_tuple()[index]
+
+    def __iter__(self):
+        return iter(self._as_tuple())
+
+    def __len__(self):
+        return 2
+
+    def __eq__(self, other):
+        if isinstance(other, Token):
+            other = other._as_tuple()  # pylint: disable=protected-access
+        elif not isinstance(other, tuple):
+            return NotImplemented
+        return self._as_tuple() == other
+
+    def __hash__(self):
+        return hash(self._as_tuple())
+
+    def __repr__(self):
+        return 'Token(%s, %r)' % (self.type.__name__, self.value)
+
+
+def parse(time, ignore_whitespace=True, with_spans=False):
     """
     Parse a string of time-related tokens, including
     * general string
@@ -240,16 +519,112 @@ def parse(time, ignore_whitespace=True):
     :param time: string to be parsed
     :param ignore_whitespace: whether or not to remove whitespace tokens
         before returning
-    :return: sequence of type/value tuples
+    :param with_spans: whether to return type/value/span tuples instead of
+        tokens, where span is a tuple of the start and end offsets of the token
+    :return: list of tokens, which can be used like type/value tuples
+    :raises ParseError: for characters which can't be part of any token
     """
-    tokens = [
-        _get_most_specific(token_type, token_value)
-        for token_type, token_value in _get_token(time)
-        if token_type != Whitespace or not ignore_whitespace
-    ]
+    tokens = []
+    for token_type, start, end in _get_token(time):
+        if token_type is Whitespace and ignore_whitespace:
+            continue
+        if token_type.subclasses:
+            value = time[start:end]
+            token_type, ordinal = _get_most_specific(token_type, value)
+        else:
+            value, ordinal = None, None
+        tokens.append(Token(token_type, value, start, end, ordinal, time))
+    if with_spans:
+        return [(token.type, token.value, token.span) for token in tokens]
     return tokens
 
 
+class SyntaxTable(object):
+    """
+    Map token type sequences to values (typically handler functions),
+    indexed once so that finding the entry for a token sequence is a single
+    dictionary lookup.  When the same type sequence appears more than once,
+    the first entry wins.
+
+    register() replaces the index with a new one instead of changing it, so
+    lookups from other threads don't need a lock.
+    """
+
+    def __init__(self, rows=(), name=None):
+        """
+        :param rows: sequence of tuples with two elements:
+            * type sequence
+            * value associated with that type sequence
+        :param name: optional name of the table, for reporting
+        """
+        self.name = name
+        self._lock = allocate_lock()
+        table = {}
+        for expected_types, value in rows:
+            table.setdefault(tuple(expected_types), value)
+        self._table = table
+
+    def __len__(self):
+        return len(self._table)
+
+    def __iter__(self):
+        return iter(self._table.items())
+
+    def register(self, expected_types, value):
+        """
+        Add a syntax to the table.
+
+        :param expected_types: sequence of token types
+        :param value: value associated with that type sequence
+        :raises ValueError: if the type sequence is already in the table
+        """
+        expected_types = tuple(expected_types)
+        with self._lock:
+            if expected_types in self._table:
+                raise ValueError('Syntax %s is already registered' % (
+                    [t.__name__ for t in expected_types],
+                ))
+            table = dict(self._table)
+            table[expected_types] = value
+            self._table = table
+
+    def lookup(self, tokens):
+        """
+        Find the value for a tokenized string.
+
+        :param tokens: sequence of type/value pairs as returned by parse()
+        :return: the associated value, or None if the syntax is not in the table
+        """
+        return self._table.get(tuple(token[0] for token in tokens))
+
+    def error(self, message, tokens):
+        """
+        Build the exception for a tokenized string whose syntax is not in the
+        table, identifying the first token that doesn't fit any syntax in the
+        table.
+
+        :param message: exception message
+        :param tokens: sequence of type/value pairs as returned by parse()
+        :return: ParseError
+        """
+        token_types = [token[0] for token in tokens]
+        matched = 0
+        for expected_types in self._table:
+            count = 0
+            for expected_type, token_type in zip(expected_types, token_types):
+                if expected_type is not token_type:
+                    break
+                count += 1
+            matched = max(matched, count)
+        span = None
+        if matched < len(tokens):
+            span = getattr(tokens[matched], 'span', None)
+        elif tokens:
+            end = getattr(tokens[-1], 'end', None)
+            span = None if end is None else (end, end)
+        return ParseError(message, span)
+
+
 def evaluate_by_syntax(what_is_being_parsed, tokens, syntax_table):
     """
     Given a tokenized form of what is being parsed, find the handler for it in
@@ -259,14 +634,18 @@ def evaluate_by_syntax(what_is_being_parsed, tokens, syntax_table):
     :param what_is_being_parsed: string repr of what is being parsed, for use
         in exception messages
     :param tokens: sequence of type/value pairs as returned by parse()
-    :param syntax_table: sequence of tuples with two elements:
+    :param syntax_table: SyntaxTable with handler functions as values, or a
+        sequence of tuples with two elements:
         * type sequence
         * reference to handler function to call when the tokens sequence has
           the same type sequence
     :return: whatever the handlers return
     """
-    token_types = [token[0] for token in tokens]
-    for expected_types, handler in syntax_table:
-        if list(expected_types) == token_types:
-            return handler(tokens)
-    raise ValueError('Time specification "%s" has unexpected syntax' % what_is_being_parsed)
+    if not isinstance(syntax_table, SyntaxTable):
+        syntax_table = SyntaxTable(syntax_table)
+    handler = syntax_table.lookup(tokens)
+    if handler is None:
+        raise syntax_table.error(
+            'Time specification "%s" has unexpected syntax' % what_is_being_parsed, tokens
+        )
+    return handler(tokens)
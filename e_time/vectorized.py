@@ -0,0 +1,204 @@
+""" Expansion of many repeat rules and guessing of many dates at once, using NumPy if available """
+from datetime import date
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .parser import (
+    _DaysRepeatPerWeek, _DaysRepeatPerWeekOfMonth, _get_now, _time_range_on_date, guess_date,
+)
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+_MINUTES_PER_DAY = 24 * 60
+
+
+def _check_rule(rule):
+    # Raise the same exception as the generators if the rule's hours and
+    # minutes can't be used to build a datetime.
+    _time_range_on_date(date(2000, 1, 1), rule.time_range, rule.hours_and_minutes, None)
+
+
+def _expand_python(rules, start, until):
+    starts, stops, rule_indices = [], [], []
+    for index, rule in enumerate(rules):
+        _check_rule(rule)
+        for starts_at, stops_at in rule.occurrences(start, until):
+            starts.append(starts_at)
+            stops.append(stops_at)
+            rule_indices.append(index)
+    return starts, stops, rule_indices
+
+
+def _rule_days(rule, days, weekdays, weeks_of_month, start, until_day):
+    if isinstance(rule, _DaysRepeatPerWeek):
+        first = start.toordinal() - _EPOCH_ORDINAL + (rule.day_of_week - start.weekday()) % 7
+        return np.arange(first, until_day, rule.days_between, dtype=np.int64)
+    if isinstance(rule, _DaysRepeatPerWeekOfMonth):
+        # how many times each week of the month (1-5) is listed
+        counts = np.zeros(6, dtype=np.int64)
+        for occurrence in rule.occurrences_of_day:
+            if 1 <= occurrence <= 5:
+                counts[occurrence] += 1
+        mask = weekdays == rule.day_of_week
+        return np.repeat(days[mask], counts[weeks_of_month[mask]])
+    raise TypeError('Unsupported rule %r' % (rule,))
+
+
+def _expand_numpy(rules, start, until):
+    first_day = start.toordinal() - _EPOCH_ORDINAL
+    until_day = max(until.toordinal() - _EPOCH_ORDINAL, first_day)
+    # days since 1970-01-01, which was a Thursday (weekday 3)
+    days = np.arange(first_day, until_day, dtype=np.int64)
+    weekdays = (days + 3) % 7
+    month_starts = days.astype('datetime64[D]').astype('datetime64[M]') \
+        .astype('datetime64[D]').astype(np.int64)
+    weeks_of_month = (days - month_starts) // 7 + 1
+
+    starts, stops, rule_indices = [], [], []
+    for index, rule in enumerate(rules):
+        _check_rule(rule)
+        rule_days = _rule_days(rule, days, weekdays, weeks_of_month, start, until_day)
+        start_hour, start_minute, stop_hour, stop_minute = rule.hours_and_minutes
+        rule_starts = rule_days * _MINUTES_PER_DAY + (start_hour * 60 + start_minute)
+        if stop_hour is None:
+            rule_stops = np.full(len(rule_days), np.iinfo(np.int64).min, dtype=np.int64)
+        else:
+            rule_stops = rule_days * _MINUTES_PER_DAY + (stop_hour * 60 + stop_minute)
+            rule_stops[rule_stops < rule_starts] += _MINUTES_PER_DAY
+        starts.append(rule_starts)
+        stops.append(rule_stops)
+        rule_indices.append(np.full(len(rule_days), index, dtype=np.int64))
+
+    if not rules:
+        return (
+            np.array([], dtype='datetime64[m]'), np.array([], dtype='datetime64[m]'),
+            np.array([], dtype=np.int64),
+        )
+    return (
+        np.concatenate(starts).astype('datetime64[m]'),
+        np.concatenate(stops).astype('datetime64[m]'),  # the minimum int64 is NaT
+        np.concatenate(rule_indices),
+    )
+
+
+def expand_rules(rules, start, until, use_numpy=None):
+    """
+    Generate the occurrences of many compiled repeat rules (as returned by
+    compile_repeat_phrase()) within a range of dates.  The occurrences are
+    naive local times, grouped by rule in the order of the rules and in
+    chronological order within each rule, exactly as the rules' occurrences()
+    methods would generate them without a time zone.
+
+    Example:
+
+    from datetime import date
+    from e_time import compile_repeat_phrase
+    from e_time.vectorized import expand_rules
+    rules = [compile_repeat_phrase('Thursdays 8pm-12am'), compile_repeat_phrase('Mondays 7pm-9pm')]
+    starts, stops, rule_indices = expand_rules(rules, date(2018, 1, 1), date(2019, 1, 1))
+
+    :param rules: sequence of compiled repeat rules
+    :param start: first datetime.date of the range
+    :param until: datetime.date following the last date of the range
+    :param use_numpy: True to require NumPy, False to avoid it, or None (the
+        default) to use it if it is installed
+    :return: start times, stop times and the index of the rule of each
+        occurrence; with NumPy, these are datetime64[m] arrays (with NaT for
+        missing stop times) and an int64 array, otherwise lists of datetimes
+        (with None for missing stop times) and a list of ints
+    """
+    if use_numpy is None:
+        use_numpy = np is not None
+    if not use_numpy:
+        return _expand_python(rules, start, until)
+    if np is None:
+        raise ImportError('NumPy is required for use_numpy=True')
+    return _expand_numpy(rules, start, until)
+
+
+def _guess_date(month, day, local_tz, now, index):
+    try:
+        return guess_date(month, day, local_tz, now)
+    except ValueError as ex:
+        raise ValueError('Error guessing date for month %d, day %d at index %d: %s' % (
+            month, day, index, ex
+        )) from ex
+
+
+def _guess_dates_python(months, days, local_tz, now):
+    guessed = {}
+    results = []
+    for index, (month, day) in enumerate(zip(months, days)):
+        result = guessed.get((month, day))
+        if result is None:
+            result = guessed[(month, day)] = _guess_date(month, day, local_tz, now, index)
+        results.append(result)
+    return results
+
+
+def _guess_dates_numpy(months, days, local_tz, now):
+    months = np.asarray(months, dtype=np.int64)
+    days = np.asarray(days, dtype=np.int64)
+    # Each valid pair has a distinct code; invalid pairs (whose codes could
+    # collide with valid ones) share the code -1, and the first of them is
+    # reported as guess_date() would report it.
+    invalid = (months < 1) | (months > 12) | (days < 1) | (days > 31)
+    pairs, first_indices, inverse = np.unique(
+        np.where(invalid, -1, months * 32 + days), return_index=True, return_inverse=True
+    )
+    guessed = []
+    failed = []
+    for pair, index in zip(pairs, first_indices):
+        result = None
+        if pair >= 0:
+            try:
+                result = guess_date(int(pair // 32), int(pair % 32), local_tz, now)
+            except ValueError:
+                pass
+        if result is None:
+            failed.append(int(index))
+        guessed.append(result)
+    if failed:
+        # the first row which can't be guessed, as in the pure-Python version
+        index = min(failed)
+        _guess_date(int(months[index]), int(days[index]), local_tz, now, index)
+    return np.array(guessed, dtype='datetime64[D]')[inverse.reshape(-1)]
+
+
+def guess_dates(months, days, local_tz=None, now=None, use_numpy=None):
+    """
+    Guess the year of many month and day pairs, with the same results as
+    calling guess_date() for each pair with the same now.  The current time
+    is read once if now is not provided, and the year is guessed once for
+    each distinct pair, so columns with millions of rows take little more
+    than a lookup per row.
+
+    Example:
+
+    from e_time.vectorized import guess_dates
+    dates = guess_dates([1, 12, 2], [13, 25, 28], now=datetime(2018, 6, 1))
+
+    :param months: sequence or array of months (1-12)
+    :param days: sequence or array of days of the month, parallel to months
+    :param local_tz: optional pytz or zoneinfo time zone, for comparing dates
+        with now as guess_date() does
+    :param now: optional datetime from which the year will be guessed
+    :param use_numpy: True to require NumPy, False to avoid it, or None (the
+        default) to use it if it is installed
+    :return: datetime64[D] array with NumPy, otherwise a list of datetime.date
+    :raises ValueError: if guess_date() would raise it for any pair (e.g.,
+        for February 29 when the guessed year isn't a leap year), with the
+        index of the first such pair in the message
+    """
+    if len(months) != len(days):
+        raise ValueError('%d months were provided for %d days' % (len(months), len(days)))
+    now = _get_now(local_tz, now)
+    if use_numpy is None:
+        use_numpy = np is not None
+    if not use_numpy:
+        return _guess_dates_python(months, days, local_tz, now)
+    if np is None:
+        raise ImportError('NumPy is required for use_numpy=True')
+    return _guess_dates_numpy(months, days, local_tz, now)
@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+import unittest
+
+import pytz
+
+from e_time import (
+    ParseFailure, compile_repeat_phrase, parse_repeat_phrase, parse_single_event,
+    parse_time_range,
+)
+from e_time.aio import (
+    aiter_occurrences, aiter_repeat_phrase, compile_repeat_phrases, parse_single_events,
+    parse_time_ranges,
+)
+
+
+TIME_ZONE = pytz.timezone('US/Eastern')
+NOW = TIME_ZONE.localize(datetime(2018, 1, 15, 12))
+
+
+def _run(coroutine):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine)
+    finally:
+        loop.close()
+
+
+async def _collect(iterable):
+    items = []
+    async for item in iterable:
+        items.append(item)
+    return items
+
+
+class TestAsyncIteration(unittest.TestCase):
+
+    def test_repeat_phrase(self):
+        phrase = 'Thursdays 8pm-12am'
+        how_long = timedelta(days=3650)
+        self.assertEqual(
+            list(parse_repeat_phrase(phrase, how_long, TIME_ZONE, NOW)),
+            _run(_collect(aiter_repeat_phrase(phrase, how_long, TIME_ZONE, NOW)))
+        )
+        with self.assertRaises(ValueError):
+            _run(_collect(aiter_repeat_phrase('Thursdays', how_long, TIME_ZONE, NOW)))
+
+    def test_occurrences(self):
+        rule = compile_repeat_phrase('1st and 3rd Wednesdays 8:30pm')
+        start, until = date(2018, 1, 1), date(2028, 1, 1)
+        self.assertEqual(
+            list(rule.occurrences(start, until, TIME_ZONE)),
+            _run(_collect(aiter_occurrences(rule, start, until, TIME_ZONE, batch_size=1)))
+        )
+
+    def test_other_tasks_run(self):
+        ticks = []
+
+        async def ticker():
+            while True:
+                ticks.append(None)
+                await asyncio.sleep(0)
+
+        async def expand():
+            task = asyncio.ensure_future(ticker())
+            count = 0
+            try:
+                async for _ in aiter_repeat_phrase(
+                        'Thursdays 8pm-9pm', timedelta(days=7 * 100), now=datetime(2018, 1, 1),
+                        batch_size=10
+                ):
+                    count += 1
+            finally:
+                task.cancel()
+            return count
+
+        self.assertEqual(100, _run(expand()))
+        self.assertGreaterEqual(len(ticks), 9)
+
+    def test_bad_batch_size(self):
+        with self.assertRaises(ValueError):
+            aiter_repeat_phrase('Thursdays 8pm-9pm', timedelta(days=7), batch_size=0)
+
+
+class TestAsyncBulk(unittest.TestCase):
+
+    def test_single_events(self):
+        lines = ['january 13 9-11pm\n', 'foo', 'march 3 9:45pm'] * 5
+        expected = []
+        for index, line in enumerate(lines):
+            try:
+                expected.append(parse_single_event(line.strip(), TIME_ZONE, NOW))
+            except ValueError as ex:
+                expected.append(ParseFailure(index, line, ex))
+        self.assertEqual(
+            expected, _run(parse_single_events(iter(lines), TIME_ZONE, NOW, batch_size=4))
+        )
+
+    def test_time_ranges(self):
+        items = [(date(2018, 1, 15), '9pm-12am'), (date(2018, 1, 16), '9pm-')]
+        results = _run(parse_time_ranges(items, TIME_ZONE))
+        self.assertEqual(parse_time_range(date(2018, 1, 15), '9pm-12am', TIME_ZONE), results[0])
+        self.assertIsInstance(results[1], ParseFailure)
+        self.assertEqual(1, results[1].index)
+
+    def test_process_pool(self):
+        lines = ['Thursdays 8pm-12am', '1st and 3rd Wednesdays 8:30pm', 'Thursdays']
+        with ProcessPoolExecutor(max_workers=2) as executor:
+            results = _run(compile_repeat_phrases(lines, executor=executor, batch_size=2))
+        self.assertEqual([compile_repeat_phrase(line) for line in lines[:2]], results[:2])
+        self.assertIsInstance(results[2], ParseFailure)
+        self.assertEqual(2, results[2].index)
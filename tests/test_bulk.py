@@ -0,0 +1,180 @@
+from datetime import date, datetime
+import io
+import unittest
+
+import pytz
+
+from e_time import (
+    cache_info, compile_repeat_phrase, iter_compile_repeat_phrases, iter_parse_single_events,
+    iter_parse_time_ranges, ParseContext, ParseError, ParseFailure, parse_many, parse_single_event,
+    parse_time_range, parse_time_ranges_bulk, set_cache_size,
+)
+from e_time.parser import DEFAULT_CACHE_SIZE
+
+
+TIME_ZONE = 'US/Eastern'
+PYTZ_TIME_ZONE = pytz.timezone(TIME_ZONE)
+
+
+class TestTimeRangesBulk(unittest.TestCase):
+
+    def setUp(self):
+        self.on_dates = [date(2018, 3, 20), date(2018, 3, 21), date(2018, 3, 22), date(2018, 3, 23)]
+        self.time_ranges = ['9pm-12am', '9pm-12am', 'bogus', '11pm']
+
+    def test_matches_serial(self):
+        results = parse_time_ranges_bulk(self.on_dates, self.time_ranges, PYTZ_TIME_ZONE)
+        self.assertEqual(4, len(results))
+        for index in (0, 1, 3):
+            self.assertEqual(
+                parse_time_range(self.on_dates[index], self.time_ranges[index], PYTZ_TIME_ZONE),
+                results[index]
+            )
+        # stop time rolls over to the next day
+        self.assertEqual(
+            PYTZ_TIME_ZONE.localize(datetime(2018, 3, 22, 0)), results[1][1]
+        )
+
+    def test_errors(self):
+        results = parse_time_ranges_bulk(self.on_dates, self.time_ranges)
+        self.assertIsInstance(results[2], ParseFailure)
+        self.assertEqual((2, 'bogus'), (results[2].index, results[2].value))
+        self.assertIsInstance(results[2].error, ValueError)
+        results = parse_time_ranges_bulk([date(2018, 3, 10)], ['13pm'])
+        self.assertIn('Error parsing time range "13pm"', str(results[0].error))
+
+    def test_lazy(self):
+        results = parse_time_ranges_bulk(self.on_dates, self.time_ranges, lazy=True)
+        self.assertEqual((datetime(2018, 3, 20, 21), datetime(2018, 3, 21, 0)), next(results))
+        self.assertEqual(
+            parse_time_ranges_bulk(self.on_dates, self.time_ranges)[1:], list(results)
+        )
+
+    def test_length_mismatch(self):
+        with self.assertRaises(ValueError):
+            parse_time_ranges_bulk(self.on_dates, self.time_ranges[1:])
+        with self.assertRaises(ValueError):
+            parse_time_ranges_bulk(self.on_dates, self.time_ranges[1:], lazy=True)
+        results = parse_time_ranges_bulk(iter(self.on_dates[1:]), iter(self.time_ranges), lazy=True)
+        next(results)
+        with self.assertRaises(ValueError):
+            list(results)
+        with self.assertRaises(ValueError):
+            parse_time_ranges_bulk(iter(self.on_dates), self.time_ranges[1:])
+
+    def test_cache_size(self):
+        # The bulk function uses the cache installed by set_cache_size()
+        try:
+            set_cache_size(0)
+            results = parse_time_ranges_bulk(self.on_dates, self.time_ranges)
+            self.assertEqual(3, cache_info().misses)  # distinct strings
+            self.assertEqual(0, cache_info().currsize)
+            self.assertEqual(parse_time_range(self.on_dates[3], '11pm'), results[3])
+        finally:
+            set_cache_size(DEFAULT_CACHE_SIZE)
+
+
+class TestIterParse(unittest.TestCase):
+
+    def setUp(self):
+        self.now = datetime(2018, 12, 1)
+        self.lines = io.StringIO('january 13 9-11pm\nbogus\r\njune 25 5:00PM - 8:00PM\n')
+
+    def test_single_events(self):
+        results = list(iter_parse_single_events(self.lines, now=self.now))
+        self.assertEqual(
+            (0, (datetime(2019, 1, 13, 21), datetime(2019, 1, 13, 23))), results[0]
+        )
+        self.assertEqual(1, results[1][0])
+        self.assertIsInstance(results[1][1], ParseFailure)
+        self.assertEqual('bogus\r\n', results[1][1].value)
+        self.assertEqual(
+            (2, (datetime(2018, 6, 25, 17), datetime(2018, 6, 25, 20))), results[2]
+        )
+
+    def test_context(self):
+        context = ParseContext(now=self.now)
+        self.assertEqual(
+            list(iter_parse_single_events(self.lines, now=self.now)),
+            list(iter_parse_single_events(io.StringIO(self.lines.getvalue()), context=context))
+        )
+        context = ParseContext(PYTZ_TIME_ZONE)
+        on_dates = [date(2018, 3, 10), date(2018, 3, 11)]
+        self.assertEqual(
+            parse_time_ranges_bulk(on_dates, ['1:30am-3am'] * 2, PYTZ_TIME_ZONE),
+            parse_time_ranges_bulk(on_dates, ['1:30am-3am'] * 2, context=context)
+        )
+
+    def test_skip_and_raise(self):
+        results = iter_parse_single_events(self.lines, now=self.now, on_error='skip')
+        self.assertEqual([0, 2], [index for index, _ in results])
+        self.lines.seek(0)
+        results = iter_parse_single_events(self.lines, now=self.now, on_error='raise')
+        next(results)
+        with self.assertRaises(ValueError):
+            next(results)
+        with self.assertRaises(ValueError):
+            iter_parse_single_events(self.lines, on_error='ignore')
+
+    def test_time_ranges(self):
+        items = iter([(date(2018, 3, 20), '9pm-12am'), (date(2018, 3, 21), '25pm')])
+        results = list(iter_parse_time_ranges(items, PYTZ_TIME_ZONE))
+        self.assertEqual(
+            (0, parse_time_range(date(2018, 3, 20), '9pm-12am', PYTZ_TIME_ZONE)), results[0]
+        )
+        self.assertIsInstance(results[1][1], ParseFailure)
+
+    def test_repeat_phrases(self):
+        results = list(iter_compile_repeat_phrases([
+            'Thursdays 8pm-12am\n', 'Thursday 8pm', '1st or 3rd Wednesdays 8:30pm',
+            'Every single Thursday 8-11pm', '1st Fridays 8:30pm-12:30am',
+        ]))
+        self.assertEqual((0, compile_repeat_phrase('Thursdays 8pm-12am')), results[0])
+        for index in (1, 2, 3):
+            self.assertIsInstance(results[index][1], ParseFailure)
+        self.assertIsInstance(results[2][1].error, ParseError)
+        self.assertEqual((4, 6), results[2][1].error.span)
+        self.assertEqual((4, compile_repeat_phrase('1st Fridays 8:30pm-12:30am')), results[4])
+
+
+class TestParseMany(unittest.TestCase):
+
+    def test_single_events(self):
+        now = PYTZ_TIME_ZONE.localize(datetime(2018, 12, 1))
+        values = ['january 13 9-11pm', 'bogus', 'june 25 5pm', 'january 13 9-11pm'] * 5
+        expected = [
+            parse_single_event(value, PYTZ_TIME_ZONE, now) if value != 'bogus' else None
+            for value in values
+        ]
+        for workers in (0, 2):
+            results = parse_many(
+                values, tz_name=TIME_ZONE, now=now, workers=workers, chunksize=1
+            )
+            self.assertEqual(len(values), len(results))
+            for index, (value, result) in enumerate(zip(values, results)):
+                if value == 'bogus':
+                    self.assertIsInstance(result, ParseFailure)
+                    self.assertEqual(index, result.index)
+                else:
+                    self.assertEqual(expected[index], result)
+
+    def test_repeat_phrases(self):
+        values = ['Thursdays 8pm-12am', '1st Fridays 8:30pm-12:30am']
+        self.assertEqual(
+            [compile_repeat_phrase(value) for value in values],
+            parse_many(values, kind='repeat_phrase', workers=2)
+        )
+
+    def test_repeat_phrase_errors(self):
+        values = ['Every single Thursday 8-11pm', 'Thursdays 9pm-10pm', '1st or 3rd Fridays 9pm']
+        for workers in (0, 2):
+            results = parse_many(values, kind='repeat_phrase', workers=workers, chunksize=1)
+            self.assertEqual([0, 2], [
+                result.index for result in results if isinstance(result, ParseFailure)
+            ])
+            self.assertIsInstance(results[0].error, ParseError)
+            self.assertEqual(compile_repeat_phrase('Thursdays 9pm-10pm'), results[1])
+
+    def test_bad_kind(self):
+        with self.assertRaises(ValueError):
+            parse_many(['9pm'], kind='time_range')
@@ -0,0 +1,114 @@
+from datetime import date, datetime, timedelta
+import unittest
+
+import pytz
+
+from e_time import compile_repeat_phrase, parse_single_event
+from e_time.index import RecurrenceIndex
+
+
+TIME_ZONE = pytz.timezone('US/Eastern')
+ANCHOR = date(2018, 1, 1)
+
+RULES = {
+    'trivia': compile_repeat_phrase('1st and 3rd Wednesdays 8:30pm'),
+    'jazz': compile_repeat_phrase('1st Fridays 8:30pm-12:30am'),
+    'dance': compile_repeat_phrase('Every other Thursday 8-11pm'),
+    'blues': compile_repeat_phrase('Thursdays 8pm-12am'),
+    'brunch': compile_repeat_phrase('Saturdays 10am-2pm'),
+}
+
+
+def _all_occurrences(rules, events):
+    occurrences = []
+    for key, rule in rules.items():
+        for starts_at, stops_at in rule.occurrences(ANCHOR, date(2019, 1, 1), TIME_ZONE):
+            occurrences.append((key, starts_at, stops_at))
+    for key, (starts_at, stops_at) in events.items():
+        occurrences.append((key, starts_at, stops_at))
+    return sorted(occurrences, key=lambda occurrence: (occurrence[1], occurrence[0]))
+
+
+class TestRecurrenceIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = RecurrenceIndex(TIME_ZONE)
+        for key, rule in RULES.items():
+            self.index.add(key, rule, anchor=ANCHOR)
+        now = TIME_ZONE.localize(datetime(2018, 1, 1))
+        self.events = {
+            'concert': parse_single_event('march 3 9-11pm', TIME_ZONE, now),
+            'opening': parse_single_event('march 4 6pm', TIME_ZONE, now),
+        }
+        for key, event in self.events.items():
+            self.index.add(key, event)
+        self.occurrences = _all_occurrences(RULES, self.events)
+
+    def assertFound(self, expected, actual):
+        self.assertEqual(
+            expected, sorted(actual, key=lambda occurrence: (occurrence[1], occurrence[0]))
+        )
+
+    def test_overlapping(self):
+        for hours in range(24 * 30, 24 * 330, 13):
+            start = TIME_ZONE.localize(datetime(2018, 1, 1) + timedelta(hours=hours))
+            end = TIME_ZONE.localize(start.replace(tzinfo=None) + timedelta(hours=hours % 50))
+
+            def overlaps(starts_at, stops_at):
+                if stops_at is None:
+                    return start <= starts_at < end
+                return starts_at < end and start < stops_at
+
+            self.assertFound(
+                [o for o in self.occurrences if overlaps(o[1], o[2])],
+                self.index.overlapping(start, end)
+            )
+
+    def test_at(self):
+        for minutes in range(0, 60 * 24 * 14, 30):
+            t = TIME_ZONE.localize(datetime(2018, 3, 1) + timedelta(minutes=minutes))
+
+            def in_progress(starts_at, stops_at):
+                if stops_at is None:
+                    return starts_at == t
+                return starts_at <= t < stops_at
+
+            self.assertFound(
+                [o for o in self.occurrences if in_progress(o[1], o[2])], self.index.at(t)
+            )
+
+    def test_add_and_remove(self):
+        t = TIME_ZONE.localize(datetime(2018, 1, 5, 23))  # 1st Friday, Thursday past
+        self.assertEqual(['jazz'], [key for key, _, _ in self.index.at(t)])
+        self.assertEqual(7, len(self.index))
+        self.assertIn('jazz', self.index)
+        with self.assertRaises(ValueError):
+            self.index.add('jazz', RULES['blues'])
+
+        self.index.remove('jazz')
+        self.assertNotIn('jazz', self.index)
+        self.assertEqual([], self.index.at(t))
+        with self.assertRaises(KeyError):
+            self.index.remove('jazz')
+
+        self.index.add('late blues', RULES['blues'], anchor=ANCHOR)
+        self.assertEqual(
+            ['blues', 'late blues'],
+            [key for key, _, _ in self.index.at(TIME_ZONE.localize(datetime(2018, 1, 4, 23)))]
+        )
+
+    def test_multiple_day_event(self):
+        index = RecurrenceIndex()
+        index.add('festival', (datetime(2018, 5, 4, 12), datetime(2018, 5, 6, 18)))
+        self.assertEqual(
+            [('festival', datetime(2018, 5, 4, 12), datetime(2018, 5, 6, 18))],
+            index.overlapping(datetime(2018, 5, 3), datetime(2018, 5, 8))
+        )
+        self.assertEqual(1, len(index.at(datetime(2018, 5, 5))))
+        self.assertEqual([], index.overlapping(datetime(2018, 5, 6, 18), datetime(2018, 5, 7)))
+
+    def test_unsupported(self):
+        with self.assertRaises(TypeError):
+            self.index.add('phrase', 'Thursdays 8pm')
+        self.assertNotIn('phrase', self.index)
+        self.assertEqual([], self.index.overlapping(datetime(2018, 5, 4), datetime(2018, 5, 3)))
@@ -0,0 +1,89 @@
+from datetime import date, datetime
+import unittest
+
+import pytz
+
+from e_time import cache_clear, guess_date, parse_single_event, parse_time_range
+from e_time import instrumentation, parser, tokens_and_syntax
+from e_time.tokens_and_syntax import SyntaxTable
+
+
+TIME_ZONE = pytz.timezone('US/Eastern')
+
+
+class TestInstrumentation(unittest.TestCase):
+
+    def setUp(self):
+        cache_clear()
+        instrumentation.reset()
+
+    def tearDown(self):
+        instrumentation.disable()
+        instrumentation.reset()
+
+    def test_disabled(self):
+        original_lookup = SyntaxTable.lookup
+        original_localize = parser._localize
+        instrumentation.enable()
+        instrumentation.disable()
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(original_lookup, SyntaxTable.lookup)
+        self.assertIs(original_localize, parser._localize)
+        parse_time_range(date(2018, 1, 15), '9pm-12am', TIME_ZONE)
+        stats = instrumentation.stats()
+        self.assertFalse(stats['enabled'])
+        for stage in instrumentation.STAGES:
+            self.assertEqual({'calls': 0, 'ns': 0}, stats['stages'][stage])
+        self.assertEqual({}, stats['syntax'])
+
+    def test_stages(self):
+        instrumentation.enable()
+        self.assertTrue(instrumentation.is_enabled())
+        now = TIME_ZONE.localize(datetime(2018, 1, 1))
+        parse_single_event('january 13 9-11pm', TIME_ZONE, now)
+        stats = instrumentation.stats()['stages']
+        self.assertEqual(1, stats['tokenize']['calls'])
+        self.assertEqual(2, stats['classify']['calls'])  # only for strings
+        self.assertEqual(2, stats['syntax']['calls'])  # single event, then time range
+        self.assertEqual(1, stats['guess_year']['calls'])
+        self.assertEqual(3, stats['localize']['calls'])
+        for stage in instrumentation.STAGES:
+            self.assertGreaterEqual(stats[stage]['ns'], 0)
+        self.assertEqual(
+            ['single_event', 'time_range'], sorted(instrumentation.stats()['syntax'])
+        )
+
+        # cached, so only the date-dependent stages are repeated
+        parse_single_event('january 13 9-11pm', TIME_ZONE, now)
+        stats = instrumentation.stats()['stages']
+        self.assertEqual(1, stats['tokenize']['calls'])
+        self.assertEqual(2, stats['guess_year']['calls'])
+
+    def test_cache_and_syntax(self):
+        instrumentation.enable()
+        for _ in range(3):
+            parse_time_range(date(2018, 1, 15), '9pm-12am')
+        with self.assertRaises(ValueError):
+            parse_time_range(date(2018, 1, 15), '9pm-')
+        guess_date(1, 13, now=datetime(2018, 1, 1))
+        stats = instrumentation.stats()
+        self.assertEqual(2, stats['cache']['hits'])
+        self.assertEqual(2, stats['cache']['misses'])
+        self.assertEqual(0.5, stats['cache']['hit_ratio'])
+        self.assertEqual(
+            {'time_range': {'Number AmPm Dash Number AmPm': 1, instrumentation.NO_MATCH: 1}},
+            stats['syntax']
+        )
+
+    def test_hook(self):
+        calls = []
+        instrumentation.enable(lambda stage, elapsed_ns: calls.append((stage, elapsed_ns)))
+        instrumentation.enable(lambda stage, elapsed_ns: calls.append(stage))
+        parse_time_range(date(2018, 1, 15), '9pm')
+        self.assertEqual(['tokenize', 'classify', 'syntax'], calls)
+
+    def test_errors_still_raised(self):
+        instrumentation.enable()
+        with self.assertRaises(tokens_and_syntax.ParseError):
+            tokens_and_syntax.parse('9pm @ 10pm')
+        self.assertEqual(1, instrumentation.stats()['stages']['tokenize']['calls'])
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+import unittest
+
+import pytz
+
+from e_time import compile_repeat_phrase, parse_repeat_phrase
+from e_time.localize import CachedTimeZone
+
+
+TIME_ZONE = 'US/Eastern'
+PYTZ_TIME_ZONE = pytz.timezone(TIME_ZONE)
+
+
+class TestCachedTimeZone(unittest.TestCase):
+
+    def setUp(self):
+        self.cached = CachedTimeZone(PYTZ_TIME_ZONE)
+
+    def test_same_as_pytz(self):
+        start = datetime(2018, 1, 1)
+        for hours in range(0, 2 * 365 * 24, 5):
+            dt = start + timedelta(hours=hours, minutes=hours % 60)
+            expected = PYTZ_TIME_ZONE.localize(dt)
+            actual = self.cached.localize(dt)
+            self.assertEqual(expected, actual)
+            self.assertIs(expected.tzinfo, actual.tzinfo)
+
+    def test_transitions(self):
+        ambiguous = datetime(2018, 11, 4, 1, 30)
+        non_existent = datetime(2018, 3, 11, 2, 30)
+        for dt in (ambiguous, non_existent):
+            for is_dst in (False, True):
+                self.assertEqual(
+                    PYTZ_TIME_ZONE.localize(dt, is_dst=is_dst),
+                    CachedTimeZone(PYTZ_TIME_ZONE, is_dst=is_dst).localize(dt)
+                )
+        strict = CachedTimeZone(PYTZ_TIME_ZONE, is_dst=None)
+        with self.assertRaises(pytz.AmbiguousTimeError):
+            strict.localize(ambiguous)
+        with self.assertRaises(pytz.NonExistentTimeError):
+            strict.localize(non_existent)
+        self.assertEqual(
+            PYTZ_TIME_ZONE.localize(datetime(2018, 11, 4, 20)),
+            strict.localize(datetime(2018, 11, 4, 20))
+        )
+
+    def test_repeat_phrase(self):
+        now = PYTZ_TIME_ZONE.localize(datetime(2018, 2, 22, 12))
+        phrase = 'Thursdays 8pm-12am'
+        self.assertEqual(
+            list(parse_repeat_phrase(phrase, timedelta(days=365), PYTZ_TIME_ZONE, now)),
+            list(parse_repeat_phrase(phrase, timedelta(days=365), self.cached, now))
+        )
+        rule = compile_repeat_phrase(phrase)
+        list(rule.occurrences(now.date(), now.date() + timedelta(days=365), self.cached))
+        self.assertGreater(self.cached.cache_info().hits, 100)
+
+    def test_not_naive(self):
+        with self.assertRaises(ValueError):
+            self.cached.localize(PYTZ_TIME_ZONE.localize(datetime(2018, 1, 1)))
+        self.assertEqual(TIME_ZONE, self.cached.zone)
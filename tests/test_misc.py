@@ -1,4 +1,7 @@
 from datetime import date, datetime
+import os
+import subprocess
+import sys
 import unittest
 
 import pytz
@@ -8,6 +11,7 @@ from e_time import guess_date
 
 TIME_ZONE = 'US/Eastern'
 PYTZ_TIME_ZONE = pytz.timezone(TIME_ZONE)
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
 
 class TestGuessYear(unittest.TestCase):
@@ -26,3 +30,38 @@ class TestGuessYear(unittest.TestCase):
         self.assertEqual(
             date(2018, 11, 15), d
         )
+
+
+class TestLazyImport(unittest.TestCase):
+
+    def run_python(self, code):
+        return subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT,
+            stdout=subprocess.PIPE, universal_newlines=True, check=True,
+        ).stdout.split()
+
+    @unittest.skipIf(sys.version_info < (3, 7), 'module __getattr__ requires Python 3.7')
+    def test_modules_imported_on_first_use(self):
+        self.assertEqual(['False', 'False', 'True', 'False'], self.run_python(
+            'import sys, e_time\n'
+            'print("e_time.parser" in sys.modules, "calendar" in sys.modules)\n'
+            'from e_time import parse_time_range\n'
+            'print("e_time.parser" in sys.modules, "e_time.bulk" in sys.modules)\n'
+        ))
+
+    def test_exports(self):
+        import e_time
+        for name in e_time.__all__:
+            self.assertIs(getattr(sys.modules[getattr(e_time, name).__module__], name),
+                          getattr(e_time, name))
+            self.assertIn(name, dir(e_time))
+        with self.assertRaises(AttributeError):
+            e_time.no_such_name  # pylint: disable=pointless-statement
+
+    def test_submodules(self):
+        self.assertEqual(['False', 'True', 'True'], self.run_python(
+            'import sys, e_time\n'
+            'print("e_time.tokens_and_syntax" in sys.modules)\n'
+            'print(callable(e_time.tokens_and_syntax.register_string_class))\n'
+            'print(e_time.parser.parse_time_range is e_time.parse_time_range)\n'
+        ))
@@ -1,15 +1,31 @@
 from datetime import date, datetime, timedelta
+import pickle
+import subprocess
+import sys
+import threading
 import unittest
 
 import pytz
 
+try:
+    import zoneinfo
+except ImportError:
+    zoneinfo = None
+
 from e_time import (
-    parse_repeat_phrase, parse_single_event, parse_time_range,
+    ParseContext, ParseError, cache_clear, cache_info, compile_repeat_phrase, guess_date,
+    iter_rules_from_bytes, next_occurrence_after, parse_repeat_phrase, parse_single_event,
+    parse_time_range, prev_occurrence_before, rule_from_bytes, set_cache_size,
 )
+from e_time import tokens_and_syntax
 from e_time.tokens_and_syntax import (
-    parse, AmPm, Comma, Dash, Day, Days, Midnight, Month, Noon, Number, String,
+    parse, AmPm, Comma, Dash, Day, Days, IgnoreCase, Midnight, Month, Noon, Number, String,
+    SyntaxTable, Token, Whitespace, evaluate_by_syntax, register_string_class,
+)
+from e_time.parser import (
+    _DaysRepeatPerWeek, _DaysRepeatPerWeekOfMonth, _guess_year, DEFAULT_CACHE_SIZE,
+    TIME_RANGE_SYNTAX,
 )
-from e_time.parser import _guess_year
 
 TIME_ZONE = 'US/Eastern'
 PYTZ_TIME_ZONE = pytz.timezone(TIME_ZONE)
@@ -204,6 +220,95 @@ class TestTimeRange(unittest.TestCase):
             )
 
 
+@unittest.skipIf(zoneinfo is None, 'zoneinfo is not available')
+class TestZoneInfo(unittest.TestCase):
+
+    def setUp(self):
+        self.zone = zoneinfo.ZoneInfo(TIME_ZONE)
+
+    def test_same_as_pytz(self):
+        for on_date in (date(2018, 1, 15), date(2018, 7, 4)):
+            for time_range in ('9pm-12am', '9pm', 'noon-2pm'):
+                starts_at, ends_at = parse_time_range(on_date, time_range, self.zone)
+                self.assertIs(self.zone, starts_at.tzinfo)
+                self.assertEqual(
+                    parse_time_range(on_date, time_range, PYTZ_TIME_ZONE),
+                    (starts_at, ends_at)
+                )
+        now = datetime(2018, 12, 1, tzinfo=self.zone)
+        self.assertEqual(
+            parse_single_event('january 13 9-11pm', PYTZ_TIME_ZONE, now),
+            parse_single_event('january 13 9-11pm', self.zone, now)
+        )
+        now = PYTZ_TIME_ZONE.localize(datetime(2018, 2, 22, 12))
+        self.assertEqual(
+            list(parse_repeat_phrase('1st Fridays 8:30pm-12:30am', timedelta(days=90),
+                                     PYTZ_TIME_ZONE, now)),
+            list(parse_repeat_phrase('1st Fridays 8:30pm-12:30am', timedelta(days=90),
+                                     self.zone, now))
+        )
+
+    def test_pytz_not_imported(self):
+        code = (
+            'import sys\n'
+            'from e_time import parse_many\n'
+            'parse_many(["january 13 9pm"], tz_name="US/Eastern", tz_backend="zoneinfo",'
+            ' workers=0)\n'
+            'print("pytz" in sys.modules)\n'
+        )
+        output = subprocess.check_output([sys.executable, '-c', code])
+        self.assertEqual(b'False', output.strip())
+
+
+class TestTemplateCache(unittest.TestCase):
+
+    def setUp(self):
+        cache_clear()
+
+    def tearDown(self):
+        set_cache_size(1024)
+
+    def test_hits_apply_date_and_time_zone(self):
+        utc = pytz.utc
+        self.assertEqual(
+            (datetime(2018, 1, 15, 21), datetime(2018, 1, 16, 0)),
+            parse_time_range(date(2018, 1, 15), '9pm-12am')
+        )
+        self.assertEqual(
+            (utc.localize(datetime(2018, 6, 1, 21)), utc.localize(datetime(2018, 6, 2, 0))),
+            parse_time_range(date(2018, 6, 1), '9pm-12am', utc)
+        )
+        self.assertEqual(
+            (PYTZ_TIME_ZONE.localize(datetime(2018, 7, 4, 21)),
+             PYTZ_TIME_ZONE.localize(datetime(2018, 7, 5, 0))),
+            parse_time_range(date(2018, 7, 4), '9pm-12am', PYTZ_TIME_ZONE)
+        )
+        info = cache_info()
+        self.assertEqual((2, 1, 1), (info.hits, info.misses, info.currsize))
+
+    def test_year_guessed_on_each_call(self):
+        for now, expected_year in (
+                (datetime(2017, 12, 31), 2018),
+                (datetime(2018, 3, 1), 2018),
+                (datetime(2019, 11, 30), 2020),
+        ):
+            starts_at, _ = parse_single_event('january 13 9pm', now=now)
+            self.assertEqual(datetime(expected_year, 1, 13, 21), starts_at)
+        self.assertEqual(2, cache_info().hits)
+
+    def test_errors_not_cached(self):
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                parse_time_range(date(2018, 1, 15), '9pm-12am-1am')
+        self.assertEqual(0, cache_info().currsize)
+
+    def test_disabled(self):
+        set_cache_size(0)
+        parse_time_range(date(2018, 1, 15), '9pm-12am')
+        parse_time_range(date(2018, 1, 15), '9pm-12am')
+        self.assertEqual(0, cache_info().hits)
+
+
 class TestTokenizing(unittest.TestCase):
 
     def test(self):
@@ -228,6 +333,164 @@ class TestTokenizing(unittest.TestCase):
             actual_syntax = [x for x, _ in actual]
             self.assertEqual(actual_syntax, expected_syntax, 'Checking "%s"' % sample)
 
+    def test_values(self):
+        self.assertEqual(
+            [(Number, '8:30'), (Whitespace, ' '), (Dash, '–'), (Whitespace, '  '),
+             (Number, '9'), (AmPm, 'p.m.'), (Comma, ','), (Comma, ',')],
+            parse('8:30 –  9p.m.,,', ignore_whitespace=False)
+        )
+
+    def test_classification(self):
+        samples = (
+            ('Mondays', Days), ('Monday', Day), ('monday', String),
+            ('P.M.', AmPm), ('SEPT', String), ('Sep', Month), ('May', Month),
+            ('MIDNIGHT', Midnight), ('Noon', Noon), ('every', String),
+        )
+        for value, token_type in samples:
+            self.assertEqual([(token_type, value)], parse(value), 'Checking "%s"' % value)
+
+    def test_lookups(self):
+        self.assertEqual(9, Month.get_month_number('september'))
+        self.assertEqual(5, Month.get_month_number('MAY'))
+        self.assertEqual(3, Day.get_day_of_week('Thursday'))
+        self.assertEqual(6, Days.get_day_of_week('Sundays'))
+        self.assertTrue(AmPm.is_pm('p.m.'))
+        self.assertFalse(AmPm.is_pm('AM'))
+        with self.assertRaises(ValueError):
+            Month.get_month_number('Monday')
+        with self.assertRaises(ValueError):
+            Day.get_day_of_week('thursday')
+
+    def test_token(self):
+        month, day, time, indicator = parse('Sep 09 8:30 p.m.')
+        self.assertEqual((Month, 'Sep'), month)
+        self.assertEqual(month, Token(Month, 'Sep', 0, 3))
+        token_type, value = day
+        self.assertEqual((Number, '09'), (token_type, value))
+        self.assertEqual((4, 6), (day.start, day.end))
+        self.assertEqual((9, 9), (month.ordinal, day.number))
+        self.assertEqual((8, 30), time.time)
+        self.assertEqual((AmPm, 1), (indicator[0], indicator.ordinal))
+        self.assertEqual((9, 0), parse('9pm')[0].time)
+        with self.assertRaises(ValueError):
+            _ = time.number
+
+    def test_bad_token(self):
+        with self.assertRaisesRegex(ValueError, 'bad token: "#"'):
+            parse('9pm # 11pm')
+
+    def test_spans(self):
+        self.assertEqual(
+            [(Number, '9', (0, 1)), (AmPm, 'pm', (1, 3)), (Dash, '-', (4, 5)),
+             (Number, '11', (6, 8)), (AmPm, 'pm', (8, 10))],
+            parse('9pm - 11pm', with_spans=True)
+        )
+
+    def test_error_spans(self):
+        with self.assertRaises(ParseError) as context:
+            parse('9pm # 11pm')
+        self.assertEqual((4, 5), context.exception.span)
+        self.assertIn('at position 4', str(context.exception))
+        for parse_it, span in (
+                (lambda: parse_time_range(date(2018, 1, 1), '9pm-'), (4, 4)),
+                (lambda: parse_time_range(date(2018, 1, 1), '9pm - noon'), (6, 10)),
+                (lambda: parse_single_event('jan 3 9pm foo'), (10, 13)),
+        ):
+            with self.assertRaises(ParseError) as context:
+                parse_it()
+            self.assertEqual(span, context.exception.span)
+
+
+class TestSyntaxTable(unittest.TestCase):
+
+    def test_lookup_and_register(self):
+        table = SyntaxTable((
+            ([Number, AmPm], 'start only'),
+            ([Number, AmPm], 'ignored duplicate'),
+        ))
+        self.assertEqual('start only', table.lookup(parse('9pm')))
+        self.assertIsNone(table.lookup(parse('noon')))
+        table.register([Noon], 'noon')
+        self.assertEqual('noon', table.lookup(parse('noon')))
+        with self.assertRaises(ValueError):
+            table.register((Noon,), 'noon again')
+        self.assertEqual(2, len(table))
+
+    def test_evaluate_by_syntax(self):
+        table = SyntaxTable((([Number, AmPm], lambda tokens: tokens[0][1]),))
+        self.assertEqual('9', evaluate_by_syntax('9pm', parse('9pm'), table))
+        # plain sequences of (types, handler) are still accepted
+        self.assertEqual('9', evaluate_by_syntax('9pm', parse('9pm'), list(table)))
+        with self.assertRaisesRegex(ValueError, 'unexpected syntax'):
+            evaluate_by_syntax('noon', parse('noon'), table)
+
+    def test_register_while_parsing(self):
+        table = SyntaxTable(TIME_RANGE_SYNTAX)
+        strings = ['9pm', '9pm-12am', '8:30-11pm', 'noon-2pm', '9pm-midnight'] * 200
+        expected = [evaluate_by_syntax(s, parse(s), table) for s in strings]
+        results = []
+
+        def parse_all():
+            results.append([evaluate_by_syntax(s, parse(s), table) for s in strings])
+
+        threads = [threading.Thread(target=parse_all) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for count in range(200):
+            table.register([Comma] * (count + 10), None)
+        for thread in threads:
+            thread.join()
+        self.assertEqual([expected] * 4, results)
+        self.assertEqual(len(TIME_RANGE_SYNTAX) + 200, len(table))
+
+
+class TestRegisterStringClass(unittest.TestCase):
+
+    def setUp(self):
+        self.saved = String.subclasses, tokens_and_syntax._KEYWORDS
+
+    def tearDown(self):
+        String.subclasses, tokens_and_syntax._KEYWORDS = self.saved
+        cache_clear()
+
+    def test_register(self):
+        class Tonight(IgnoreCase, String):
+            values = ['tonight']
+
+        self.assertIsInstance(String.subclasses, tuple)
+        self.assertEqual([(String, 'tonight')], parse('tonight'))
+        register_string_class(Tonight)
+        self.assertEqual([(Tonight, 'Tonight')], parse('Tonight'))
+        self.assertEqual(Tonight, String.subclasses[-1])
+        # existing classes keep precedence
+        self.assertEqual([(Midnight, 'midnight')], parse('midnight'))
+        with self.assertRaises(ValueError):
+            register_string_class(Tonight)
+
+    def test_caches_cleared(self):
+        class Unusual(IgnoreCase, String):
+            values = ['other']
+
+        phrase = 'Every other Thursday 8-11pm'
+        context = ParseContext(now=datetime(2018, 1, 1), cache_size=10)
+        compile_repeat_phrase(phrase)
+        context.compile_repeat_phrase(phrase)
+        register_string_class(Unusual)
+        for compile_phrase in (compile_repeat_phrase, context.compile_repeat_phrase):
+            with self.assertRaises(ParseError):
+                compile_phrase(phrase)
+
+    def test_case_sensitive_precedence(self):
+        class Cap(String):
+            values = ['Noon', 'May', 'Capital', 'Monday']
+
+        register_string_class(Cap)
+        self.assertEqual([(Noon, 'Noon')], parse('Noon'))
+        self.assertEqual(Month, parse('May')[0].type)
+        self.assertEqual(Day, parse('Monday')[0].type)
+        self.assertEqual([(Cap, 'Capital')], parse('Capital'))
+        self.assertEqual([(String, 'capital')], parse('capital'))
+
 
 class TestRepeatPhrase(unittest.TestCase):
 
@@ -328,3 +591,329 @@ class TestRepeatPhrase(unittest.TestCase):
             start_stop_times,
             list(rv)
         )
+
+
+class TestCompileRepeatPhrase(unittest.TestCase):
+
+    def test_occurrences(self):
+        now = PYTZ_TIME_ZONE.localize(datetime(2018, 2, 22, 12))
+        for phrase in ('1st and 3rd Wednesdays 8:30pm', 'Every other Thursday 8-11pm'):
+            rule = compile_repeat_phrase(phrase)
+            self.assertEqual(
+                list(parse_repeat_phrase(phrase, timedelta(days=90), PYTZ_TIME_ZONE, now)),
+                list(rule.occurrences(date(2018, 2, 22), date(2018, 5, 23), PYTZ_TIME_ZONE))
+            )
+
+    def test_between(self):
+        rule = compile_repeat_phrase('Thursdays 8pm-12am')
+        start = PYTZ_TIME_ZONE.localize(datetime(2018, 3, 1, 20, 30))
+        end = PYTZ_TIME_ZONE.localize(datetime(2018, 3, 15, 20))
+        self.assertEqual(
+            [(PYTZ_TIME_ZONE.localize(datetime(2018, 3, 8, 20)),
+              PYTZ_TIME_ZONE.localize(datetime(2018, 3, 9, 0)))],
+            list(rule.between(start, end, PYTZ_TIME_ZONE))
+        )
+
+    def test_immutable_and_picklable(self):
+        rule = compile_repeat_phrase('1st Fridays 8:30pm-12:30am')
+        self.assertEqual((20, 30, 0, 30), rule.hours_and_minutes)
+        with self.assertRaises(AttributeError):
+            rule.day_of_week = 2
+        data = pickle.dumps(rule)
+        try:
+            set_cache_size(0)
+            copy = pickle.loads(data)
+            self.assertEqual(0, cache_info().misses)  # the time range isn't parsed
+        finally:
+            set_cache_size(DEFAULT_CACHE_SIZE)
+        self.assertEqual(rule, copy)
+        self.assertEqual(rule.hours_and_minutes, copy.hours_and_minutes)
+        self.assertEqual(hash(rule), hash(copy))
+        self.assertEqual(
+            list(rule.occurrences(date(2018, 1, 1), date(2018, 3, 1))),
+            list(copy.occurrences(date(2018, 1, 1), date(2018, 3, 1)))
+        )
+
+    def test_bad_phrase(self):
+        with self.assertRaises(ValueError):
+            compile_repeat_phrase('Thursdays at 8pm')
+        for phrase, span in (
+                ('1st or 3rd Wednesdays 8:30pm', (4, 6)),
+                ('1st and 3rdd Wednesdays 8:30pm', (9, 12)),
+                ('Every single Thursday 8-11pm', (6, 12)),
+                ('Each other Thursday 8-11pm', (0, 4)),
+        ):
+            with self.assertRaises(ParseError) as raised:
+                compile_repeat_phrase(phrase)
+            self.assertEqual(span, raised.exception.span)
+
+    def test_bytes(self):
+        rules = [compile_repeat_phrase(phrase) for phrase in (
+            '1st and 3rd Wednesdays 8:30pm', '1st Fridays 20:30-23:30',
+            'Every other Thursday 8-11pm', 'Thursdays 8pm-12am',
+        )]
+        info = cache_info()
+        copies = [rule_from_bytes(rule.to_bytes()) for rule in rules]
+        self.assertEqual(info, cache_info())  # nothing parsed
+        self.assertEqual(rules, copies)
+        for rule, copy in zip(rules, copies):
+            self.assertEqual(rule.hours_and_minutes, copy.hours_and_minutes)
+
+        data = b''.join(rule.to_bytes() for rule in rules * 2)
+        copies = list(iter_rules_from_bytes(memoryview(data)))
+        self.assertEqual(rules * 2, copies)
+        self.assertIs(copies[0], copies[len(rules)])
+        self.assertEqual([], list(iter_rules_from_bytes(b'')))
+
+    def test_bad_bytes(self):
+        data = compile_repeat_phrase('Thursdays 8pm-12am').to_bytes()
+        bad_version, bad_kind = b'\x02' + data[1:], data[:1] + b'\x09' + data[2:]
+        for bad in (data[:-1], data[:3], data + b'\x00', bad_version, bad_kind):
+            with self.assertRaises(ValueError):
+                rule_from_bytes(bad)
+        with self.assertRaises(ValueError):
+            list(iter_rules_from_bytes(data + data[:5]))
+        with self.assertRaises(ValueError):
+            _DaysRepeatPerWeek(3, 7 * 10000, '8pm-12am').to_bytes()
+        with self.assertRaises(ValueError):
+            rule_from_bytes(data[:5] + b'\x18' + data[6:])  # stop hour 24
+
+    def test_bytes_times_of_day(self):
+        rule = compile_repeat_phrase('1st Fridays 20:30-23:59')
+        copy = rule_from_bytes(rule.to_bytes())
+        self.assertEqual((20, 30, 23, 59), copy.hours_and_minutes)
+        start_only = compile_repeat_phrase('1st and 3rd Wednesdays 12am')
+        self.assertEqual(
+            (0, 0, None, None), rule_from_bytes(start_only.to_bytes()).hours_and_minutes
+        )
+        for phrase in ('1st Fridays 20:30-255', '1st Fridays 20:30-23:60', '1st Fridays 24-25'):
+            with self.assertRaises(ValueError):
+                compile_repeat_phrase(phrase).to_bytes()
+
+
+class TestDaysRepeatPerWeekOfMonth(unittest.TestCase):
+
+    def test_between(self):
+        # 1st and 5th Mondays; only some months have a 5th Monday
+        repeat = _DaysRepeatPerWeekOfMonth(0, [5, 1], '8pm')
+        self.assertEqual(
+            [(4, 2, 2018), (4, 30, 2018), (5, 7, 2018), (6, 4, 2018)],
+            list(repeat.get_occurrences_between(date(2018, 4, 1), date(2018, 6, 5)))
+        )
+        self.assertEqual(
+            [(4, 30, 2018)],
+            list(repeat.get_occurrences_between(date(2018, 4, 3), date(2018, 5, 7)))
+        )
+
+    def test_duplicate_occurrence(self):
+        repeat = _DaysRepeatPerWeekOfMonth(4, [2, 2], '8pm')
+        self.assertEqual(
+            [(12, 14, 2018), (12, 14, 2018), (1, 11, 2019), (1, 11, 2019)],
+            list(repeat.get_occurrences(timedelta(days=45), None, datetime(2018, 12, 1, 12)))
+        )
+
+
+class TestDaysRepeatPerWeek(unittest.TestCase):
+
+    def setUp(self):
+        # every other Thursday, starting with the first one on or after the start date
+        self.repeat = _DaysRepeatPerWeek(3, 14, '8-11pm')
+
+    def test_between(self):
+        self.assertEqual(
+            [(2, 22, 2018), (3, 8, 2018), (3, 22, 2018)],
+            list(self.repeat.get_occurrences_between(date(2018, 2, 17), date(2018, 4, 5)))
+        )
+
+    def test_count_and_nth(self):
+        start = date(2018, 2, 17)
+        for until in (date(2018, 2, 22), date(2018, 2, 23), date(2018, 4, 5), date(2019, 1, 1)):
+            occurrences = list(self.repeat.get_occurrences_between(start, until))
+            self.assertEqual(len(occurrences), self.repeat.count_occurrences(start, until))
+            for n, occurrence in enumerate(occurrences):
+                self.assertEqual(occurrence, self.repeat.nth_occurrence(n, start))
+        self.assertEqual(0, self.repeat.count_occurrences(start, date(2018, 1, 1)))
+        # ranges before, at and after an anchor, on its cycle
+        anchor = date(2018, 3, 1)
+        for start in (date(2018, 1, 1), date(2018, 2, 17), anchor, date(2018, 3, 2)):
+            for until in (date(2018, 3, 8), date(2018, 3, 9), date(2018, 6, 1)):
+                occurrences = list(self.repeat.get_occurrences_between(start, until, anchor))
+                self.assertEqual(
+                    len(occurrences), self.repeat.count_occurrences(start, until, anchor)
+                )
+                for n, occurrence in enumerate(occurrences):
+                    self.assertEqual(occurrence, self.repeat.nth_occurrence(n, start, anchor))
+        with self.assertRaises(ValueError):
+            self.repeat.nth_occurrence(-1, start)
+
+    def test_anchor(self):
+        anchor = date(2018, 2, 17)
+        everything = list(self.repeat.occurrences(anchor, date(2018, 6, 1), anchor=anchor))
+        pages = []
+        for start, until in ((date(2018, 2, 17), date(2018, 3, 1)),
+                             (date(2018, 3, 1), date(2018, 4, 1)),
+                             (date(2018, 4, 1), date(2018, 6, 1))):
+            pages.extend(self.repeat.occurrences(start, until, anchor=anchor))
+        self.assertEqual(everything, pages)
+        # without the anchor, the second page starts a new cycle
+        self.assertEqual(
+            (datetime(2018, 3, 1, 20), datetime(2018, 3, 1, 23)),
+            next(iter(self.repeat.occurrences(date(2018, 3, 1), date(2018, 4, 1))))
+        )
+        # occurrences before the anchor are on the same cycle
+        self.assertEqual(
+            [(2, 8, 2018), (2, 22, 2018)],
+            list(self.repeat.get_occurrences_between(date(2018, 2, 1), date(2018, 3, 1), anchor))
+        )
+        self.assertEqual(
+            [(datetime(2018, 3, 8, 20), datetime(2018, 3, 8, 23))],
+            list(self.repeat.between(
+                datetime(2018, 3, 1), datetime(2018, 3, 15), anchor=anchor
+            ))
+        )
+
+
+class TestNextAfterPrevBefore(unittest.TestCase):
+
+    PHRASES = (
+        '1st and 3rd Wednesdays 8:30pm',
+        '2nd and 4th Mondays 7pm',
+        '1st Fridays 8:30pm-12:30am',
+        'Every other Thursday 8-11pm',
+        'Thursdays 8pm-12am',
+    )
+
+    def test_same_as_occurrences(self):
+        anchor = date(2018, 1, 1)
+        for phrase in self.PHRASES:
+            rule = compile_repeat_phrase(phrase)
+            occurrences = list(rule.occurrences(anchor, date(2019, 1, 1), PYTZ_TIME_ZONE))
+            starts = [starts_at for starts_at, _ in occurrences]
+            kwargs = {'anchor': anchor} if isinstance(rule, _DaysRepeatPerWeek) else {}
+            for hours in range(24 * 30, 24 * 330, 7):
+                t = PYTZ_TIME_ZONE.localize(datetime(2018, 1, 1) + timedelta(hours=hours))
+                following = next(o for o in occurrences if o[0] > t)
+                preceding = [o for o in occurrences if o[0] < t][-1]
+                self.assertEqual(following, rule.next_after(t, PYTZ_TIME_ZONE, **kwargs))
+                self.assertEqual(preceding, rule.prev_before(t, PYTZ_TIME_ZONE, **kwargs))
+            # exactly at the start of an occurrence
+            t = starts[10]
+            self.assertEqual(occurrences[11], rule.next_after(t, PYTZ_TIME_ZONE, **kwargs))
+            self.assertEqual(occurrences[9], rule.prev_before(t, PYTZ_TIME_ZONE, **kwargs))
+
+    def test_from_phrase(self):
+        t = datetime(2018, 2, 22, 21)  # during a Thursday occurrence
+        self.assertEqual(
+            (datetime(2018, 3, 8, 20), datetime(2018, 3, 8, 23)),
+            next_occurrence_after('Every other Thursday 8-11pm', t)
+        )
+        self.assertEqual(
+            (datetime(2018, 2, 22, 20), datetime(2018, 2, 22, 23)),
+            prev_occurrence_before('Every other Thursday 8-11pm', t)
+        )
+        self.assertEqual(
+            (datetime(2018, 3, 7, 20, 30), None),
+            next_occurrence_after('1st and 3rd Wednesdays 8:30pm', t)
+        )
+        self.assertEqual(
+            (datetime(2018, 2, 21, 20, 30), None),
+            prev_occurrence_before('1st and 3rd Wednesdays 8:30pm', t)
+        )
+
+    def test_fifth_occurrence(self):
+        # 5th Mondays: none in May through July 2018
+        rule = _DaysRepeatPerWeekOfMonth(0, [5], '8pm')
+        self.assertEqual(
+            (datetime(2018, 7, 30, 20), None), rule.next_after(datetime(2018, 5, 1))
+        )
+        self.assertEqual(
+            (datetime(2018, 4, 30, 20), None), rule.prev_before(datetime(2018, 7, 1))
+        )
+
+    def test_no_occurrences(self):
+        rule = _DaysRepeatPerWeekOfMonth(0, [6], '8pm')
+        self.assertIsNone(rule.next_after(datetime(2018, 5, 1)))
+        self.assertIsNone(rule.prev_before(datetime(2018, 5, 1)))
+
+
+class TestParseContext(unittest.TestCase):
+
+    def setUp(self):
+        self.now = PYTZ_TIME_ZONE.localize(datetime(2018, 11, 20, 12))
+        self.context = ParseContext(PYTZ_TIME_ZONE, self.now)
+
+    def test_same_results(self):
+        for when in ('january 13 9-11pm', 'march 11 2:30am', 'november 4 1:30-2:30am',
+                     'Dec 25, 2019 10am'):
+            self.assertEqual(
+                parse_single_event(when, PYTZ_TIME_ZONE, self.now),
+                parse_single_event(when, context=self.context)
+            )
+        for on_date in (date(2018, 3, 11), date(2018, 11, 4), date(2018, 6, 1)):
+            self.assertEqual(
+                parse_time_range(on_date, '1:30am-3am', PYTZ_TIME_ZONE),
+                parse_time_range(on_date, '1:30am-3am', context=self.context)
+            )
+        how_long = timedelta(days=365)
+        self.assertEqual(
+            list(parse_repeat_phrase('Every other Thursday 8-11pm', how_long, PYTZ_TIME_ZONE,
+                                     self.now)),
+            list(parse_repeat_phrase('Every other Thursday 8-11pm', how_long,
+                                     context=self.context))
+        )
+        self.assertEqual(
+            guess_date(1, 13, PYTZ_TIME_ZONE, self.now), guess_date(1, 13, context=self.context)
+        )
+        t = PYTZ_TIME_ZONE.localize(datetime(2018, 12, 1))
+        self.assertEqual(
+            next_occurrence_after('Thursdays 8pm-12am', t, PYTZ_TIME_ZONE),
+            next_occurrence_after('Thursdays 8pm-12am', t, context=self.context)
+        )
+        self.assertEqual(
+            prev_occurrence_before('Thursdays 8pm-12am', t, PYTZ_TIME_ZONE),
+            prev_occurrence_before('Thursdays 8pm-12am', t, context=self.context)
+        )
+
+    def test_now_resolved_once(self):
+        context = ParseContext(PYTZ_TIME_ZONE)
+        self.assertIsNotNone(context.now.tzinfo)
+        first = context.parse_single_event('january 13 9-11pm')
+        self.assertEqual(first, context.parse_single_event('january 13 9-11pm'))
+        self.assertEqual(context.now, ParseContext(PYTZ_TIME_ZONE, context.now).now)
+
+    def test_local_tz_and_context(self):
+        with self.assertRaises(ValueError):
+            parse_single_event('january 13 9-11pm', PYTZ_TIME_ZONE, context=self.context)
+        with self.assertRaises(ValueError):
+            parse_time_range(date(2018, 1, 1), '9pm', PYTZ_TIME_ZONE, context=self.context)
+
+    def test_private_cache(self):
+        context = ParseContext(cache_size=10, now=datetime(2018, 1, 1))
+        cache_clear()
+        context.parse_time_range(date(2018, 1, 1), '9pm')
+        context.parse_time_range(date(2018, 1, 2), '9pm')
+        self.assertEqual((1, 1, 10, 1), tuple(context.cache_info()))
+        self.assertEqual(0, cache_info().currsize)
+        self.assertEqual(
+            compile_repeat_phrase('Thursdays 8pm-12am'),
+            compile_repeat_phrase('Thursdays 8pm-12am', context=context)
+        )
+
+    def test_pickle(self):
+        context = pickle.loads(pickle.dumps(ParseContext(PYTZ_TIME_ZONE)))
+        self.assertEqual(
+            parse_single_event('january 13 9-11pm', context=self.context),
+            pickle.loads(pickle.dumps(self.context)).parse_single_event('january 13 9-11pm')
+        )
+        self.assertIsNotNone(context.now)
+
+    @unittest.skipIf(zoneinfo is None, 'zoneinfo is not available')
+    def test_zoneinfo(self):
+        local_tz = zoneinfo.ZoneInfo(TIME_ZONE)
+        now = datetime(2018, 11, 20, 12, tzinfo=local_tz)
+        context = ParseContext(local_tz, now)
+        self.assertIs(local_tz, context.local_tz)
+        self.assertEqual(
+            parse_single_event('march 11 2:30am', local_tz, now),
+            parse_single_event('march 11 2:30am', context=context)
+        )
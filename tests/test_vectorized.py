@@ -0,0 +1,131 @@
+from datetime import date, datetime
+import unittest
+
+import pytz
+
+from e_time import compile_repeat_phrase, guess_date
+from e_time.parser import _DaysRepeatPerWeekOfMonth
+from e_time.vectorized import expand_rules, guess_dates, np
+
+TIME_ZONE = pytz.timezone('US/Eastern')
+
+
+PHRASES = (
+    '1st and 3rd Wednesdays 8:30pm',
+    '1st Fridays 8:30pm-12:30am',
+    'Every other Thursday 8-11pm',
+    'Thursdays 8pm-12am',
+    '1st Fridays 20:30-23:30',
+)
+
+
+class TestExpandRules(unittest.TestCase):
+
+    def setUp(self):
+        self.rules = [compile_repeat_phrase(phrase) for phrase in PHRASES]
+        self.rules.append(_DaysRepeatPerWeekOfMonth(6, [5, 2, 5], '1pm'))
+
+    def test_python(self):
+        starts, stops, rule_indices = expand_rules(
+            self.rules, date(2018, 2, 1), date(2018, 3, 1), use_numpy=False
+        )
+        self.assertEqual(datetime(2018, 2, 7, 20, 30), starts[0])
+        self.assertIsNone(stops[0])
+        self.assertEqual(0, rule_indices[0])
+        expected = [
+            occurrence
+            for rule in self.rules
+            for occurrence in rule.occurrences(date(2018, 2, 1), date(2018, 3, 1))
+        ]
+        self.assertEqual(expected, list(zip(starts, stops)))
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy_matches_python(self):
+        for start, until in (
+                (date(2018, 1, 1), date(2019, 1, 1)),
+                (date(2017, 12, 31), date(2018, 4, 30)),
+                (date(2018, 3, 3), date(2018, 3, 3)),
+        ):
+            expected = expand_rules(self.rules, start, until, use_numpy=False)
+            actual = expand_rules(self.rules, start, until, use_numpy=True)
+            self.assertEqual(expected[0], actual[0].astype(datetime).tolist())
+            self.assertEqual(expected[1], actual[1].astype(datetime).tolist())
+            self.assertEqual(expected[2], actual[2].tolist())
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy_no_rules(self):
+        starts, stops, rule_indices = expand_rules([], date(2018, 1, 1), date(2019, 1, 1))
+        self.assertEqual((0, 0, 0), (len(starts), len(stops), len(rule_indices)))
+
+
+class TestGuessDates(unittest.TestCase):
+
+    NOWS = (
+        datetime(2018, 1, 1), datetime(2018, 6, 1, 12), datetime(2020, 3, 31, 23, 59),
+        datetime(2020, 11, 25), datetime(2020, 11, 26, 0, 30), datetime(2019, 12, 31, 23),
+    )
+
+    def setUp(self):
+        # every month and day, twice
+        self.months, self.days = [], []
+        for month in range(1, 13):
+            for day in range(1, 32):
+                try:
+                    date(2020, month, day)
+                except ValueError:
+                    continue
+                self.months.append(month)
+                self.days.append(day)
+        self.months *= 2
+        self.days *= 2
+
+    def _check(self, use_numpy):
+        for local_tz in (None, TIME_ZONE):
+            for now in self.NOWS:
+                if local_tz is not None:
+                    now = local_tz.localize(now)
+                months, days, expected = [], [], []
+                failed = None
+                for index, (month, day) in enumerate(zip(self.months, self.days)):
+                    try:
+                        expected.append(guess_date(month, day, local_tz, now))
+                    except ValueError:
+                        if failed is None:
+                            failed = index
+                        continue
+                    months.append(month)
+                    days.append(day)
+                if failed is not None:
+                    with self.assertRaisesRegex(ValueError, 'at index %d' % failed):
+                        guess_dates(self.months, self.days, local_tz, now, use_numpy)
+                actual = guess_dates(months, days, local_tz, now, use_numpy)
+                if use_numpy:
+                    actual = actual.astype(object).tolist()
+                self.assertEqual(expected, actual)
+
+    def test_python(self):
+        self._check(use_numpy=False)
+
+    @unittest.skipIf(np is None, 'NumPy is not installed')
+    def test_numpy(self):
+        self._check(use_numpy=True)
+        self.assertEqual(0, len(guess_dates([], [], now=datetime(2018, 1, 1), use_numpy=True)))
+        with self.assertRaisesRegex(ValueError, 'month 1, day 32 at index 1'):
+            guess_dates([1, 1], [31, 32], now=datetime(2018, 1, 1), use_numpy=True)
+
+    def test_first_failure(self):
+        # an invalid date is reported before an out-of-range month after it
+        now = datetime(2018, 6, 1)
+        for use_numpy in (False, True) if np is not None else (False,):
+            with self.assertRaisesRegex(ValueError, 'month 2, day 30 at index 0'):
+                guess_dates([2, 13], [30, 1], now=now, use_numpy=use_numpy)
+            with self.assertRaisesRegex(ValueError, 'month 13, day 1 at index 1'):
+                guess_dates([1, 13, 2], [1, 1, 30], now=now, use_numpy=use_numpy)
+
+    def test_leap_year(self):
+        now = datetime(2020, 6, 1)
+        self.assertEqual([date(2020, 2, 29)], guess_dates([2], [29], now=now, use_numpy=False))
+        with self.assertRaises(ValueError):
+            guess_dates([2], [29], now=datetime(2020, 11, 26), use_numpy=False)
+        with self.assertRaises(ValueError):
+            guess_dates([1, 2], [13], now=now)